@@ -0,0 +1,143 @@
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Batch runs never plot, so matplotlib is kept off any GUI backend
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+from run import RobotPathPlanner, import_planning_dependencies
+
+
+def find_npy_files(patterns):
+    """
+    Expands directories and glob patterns to a sorted list of .npy files.
+
+    Args:
+        patterns (list): Directories (searched for *.npy), glob patterns or file paths.
+
+    Returns:
+        list: Unique .npy file paths, in the order the patterns were given.
+    """
+    files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, '*.npy'))
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        files += sorted(match for match in matches if match.endswith('.npy') and os.path.isfile(match))
+    return list(dict.fromkeys(files))
+
+
+def plan_file(file_path, verbose=False):
+    """
+    Plans one occupancy grid the way run.main does and reports the outcome.
+
+    Args:
+        file_path (str): Path of the .npy occupancy grid.
+        verbose (bool, optional): Keep the planner's own prints. Defaults to False.
+
+    Returns:
+        dict: file, status ('ok', 'no_path' or 'error'), the smoothed path, setup and plan
+            times in seconds, expanded nodes, and the error message on failure.
+    """
+    result = {'file': file_path, 'status': 'error', 'path': [], 'setup': None, 'plan': None, 'expanded': 0, 'error': None}
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        with output:
+            start = time.perf_counter()
+            planner = RobotPathPlanner(np.load(file_path, mmap_mode='r'))
+            result['setup'] = time.perf_counter() - start
+            start = time.perf_counter()
+            path = planner.run()
+            result['plan'] = time.perf_counter() - start
+        context = planner.planner.context
+        result['expanded'] = context.expanded if context is not None else 0
+        result['path'] = np.asarray(path).tolist()
+        result['status'] = 'ok' if len(path) else 'no_path'
+    except Exception as error:
+        result['error'] = ''.join(traceback.format_exception_only(type(error), error)).strip()
+    return result
+
+
+def run_batch(files, output, max_workers=None, max_pending=None, verbose=False):
+    """
+    Plans every file in a process pool and writes one JSON line per file as soon as it finishes.
+
+    Workers import the planner once and are reused for every file. At most max_pending
+    files are in flight, so memory stays flat however many files there are. Lines are
+    written in completion order, not input order.
+
+    Args:
+        files (list): .npy file paths.
+        output (file): Text stream the JSON lines are written to.
+        max_workers (int, optional): Size of the process pool. Defaults to the CPU count.
+            With 1 the files are planned in this process.
+        max_pending (int, optional): Files submitted but not yet written. Defaults to 4 per worker.
+        verbose (bool, optional): Keep the planner's own prints. Defaults to False.
+
+    Returns:
+        dict: Count of files per status.
+    """
+    counts = {'ok': 0, 'no_path': 0, 'error': 0}
+
+    def write(result):
+        counts[result['status']] += 1
+        output.write(json.dumps(result) + '\n')
+        output.flush()
+
+    if max_workers == 1:
+        for file_path in files:
+            write(plan_file(file_path, verbose))
+        return counts
+
+    # Forked workers inherit the modules imported here instead of importing them each
+    import_planning_dependencies()
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 4 * max_workers
+    remaining = iter(files)
+    with ProcessPoolExecutor(max_workers) as executor:
+        pending = set()
+        while True:
+            for file_path in remaining:
+                pending.add(executor.submit(plan_file, file_path, verbose))
+                if len(pending) >= max_pending:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(future.result())
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plan every .npy occupancy grid of directories or glob patterns in parallel.')
+    parser.add_argument('inputs', nargs='+', help='directories (searched for *.npy), glob patterns or .npy files')
+    parser.add_argument('-o', '--output', default='-', help='JSON Lines file for the results (default: stdout)')
+    parser.add_argument('-j', '--workers', type=int, default=None, help='worker processes (default: CPU count, 1 runs in process)')
+    parser.add_argument('--max-pending', type=int, default=None, help='files in flight at once (default: 4 per worker)')
+    parser.add_argument('-v', '--verbose', action='store_true', help="keep the planner's own prints")
+    args = parser.parse_args()
+
+    files = find_npy_files(args.inputs)
+    if not files:
+        parser.error('no .npy files found')
+
+    start = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        output = sys.stdout if args.output == '-' else stack.enter_context(open(args.output, 'w'))
+        counts = run_batch(files, output, args.workers, args.max_pending, args.verbose)
+    elapsed = time.perf_counter() - start
+    print(f"{len(files)} files in {elapsed:.2f} s: {counts['ok']} ok, {counts['no_path']} without a path, {counts['error']} failed", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
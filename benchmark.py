@@ -0,0 +1,288 @@
+import argparse
+import time
+import numpy as np
+import math
+from singaboat_vrx.custom_plan1.path_planning_utils import environment, bstar, bi_bstar, dstar_lite, hierarchical, jump_point
+from run import RobotPathPlanner
+
+
+def main_scenario_environment():
+    """
+    Builds the 50x50 environment used by main.py.
+
+    Returns:
+        Environment: The initialized environment object.
+    """
+    env = environment.Environment(50, 50, grid_backend='array')
+    env.put_robot_and_end_in_memory(25, 49, 0, 0, 25, 0)
+    env.put_obstacles_in_memory([1, 10, 4], [25, 8, 4], [1, 0, 0], [0, 0, 0])
+    return env
+
+
+def synthetic_occupancy_grid(size=250, seed=0):
+    """
+    Generates a flat occupancy grid in the format recorded by the boat, with
+    scattered rectangular obstacles, a few repulsion cells and the robot and
+    end on opposite sides.
+
+    Args:
+        size (int, optional): Width and height of the grid. Defaults to 250.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        np.ndarray: Flat array of size * size cells.
+    """
+    rng = np.random.default_rng(seed)
+    array = np.zeros((size, size), dtype=np.int32)
+    for _ in range(size // 5):
+        x, y = rng.integers(0, size - 10, 2)
+        w, h = rng.integers(2, 10, 2)
+        array[y:y + h, x:x + w] = 500
+    for x, y in rng.integers(size // 4, 3 * size // 4, (3, 2)):
+        array[y, x] = 5
+    array[size - 1, size // 2] = 1
+    array[0, size // 2] = 2
+    return array.ravel()
+
+
+def npy_scenario_environment(file_path=None):
+    """
+    Builds the environment RobotPathPlanner sets up for a recorded .npy map,
+    or for a synthetic 250x250 map when no file is given.
+
+    Args:
+        file_path (str, optional): The path to the .npy file. Defaults to None.
+
+    Returns:
+        RobotPathPlanner: The initialized planner.
+    """
+    array = np.load(file_path) if file_path else synthetic_occupancy_grid()
+    return RobotPathPlanner(array)
+
+
+def benchmark_search(env, params, repeat, terminate_on='push'):
+    """
+    Times the reverse B* search and the raw path extraction on an environment.
+
+    Args:
+        env (Environment): The environment to plan on.
+        params (tuple): (obstacle_penalty, repulsion_penalty, movement, k_factor).
+        repeat (int): Number of timed runs.
+        terminate_on (str, optional): 'push' or 'pop' goal detection. Defaults to 'push'.
+
+    Returns:
+        dict: Best search and extraction times, expansions and path length.
+    """
+    obstacle_penalty, repulsion_penalty, movement, k_factor = params
+    search_times, path_times = [], []
+    for _ in range(repeat):
+        planner = bstar.PathPlanner(env, obstacle_penalty, repulsion_penalty)
+        start = time.perf_counter()
+        planner.calculate_all_cost_and_heuristics_from_end_to_robot(movement, k_factor, terminate_on)
+        search_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        path, _ = planner.raw_path_finder_from_robot_to_end(movement)
+        path_times.append(time.perf_counter() - start)
+    return {
+        'search': min(search_times),
+        'path': min(path_times),
+        'expanded': len(planner.closed),
+        'path_length': len(path),
+    }
+
+
+def benchmark_bidirectional_search(env, params, repeat):
+    """
+    Times the bidirectional search and the path join on an environment.
+
+    Args:
+        env (Environment): The environment to plan on.
+        params (tuple): (obstacle_penalty, repulsion_penalty, movement, k_factor), k_factor is unused.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Best search and extraction times, expansions and path length.
+    """
+    obstacle_penalty, repulsion_penalty, movement, _ = params
+    search_times, path_times = [], []
+    for _ in range(repeat):
+        planner = bi_bstar.BidirectionalBstar(env, obstacle_penalty, repulsion_penalty)
+        start = time.perf_counter()
+        planner.calculate_cost_and_heuristics_from_both_sides(movement)
+        search_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        path, _ = planner.raw_path_finder_from_robot_to_end(movement)
+        path_times.append(time.perf_counter() - start)
+    return {
+        'search': min(search_times),
+        'path': min(path_times),
+        'expanded': planner.expanded,
+        'path_length': len(path),
+    }
+
+
+def benchmark_jump_point_search(env, params, repeat):
+    """
+    Times Jump Point Search and the path expansion on an environment.
+
+    Args:
+        env (Environment): The environment to plan on.
+        params (tuple): (obstacle_penalty, repulsion_penalty, movement, k_factor), movement must be 'queen'.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Best search and extraction times, expansions and path length.
+    """
+    obstacle_penalty, repulsion_penalty, movement, _ = params
+    search_times, path_times = [], []
+    for _ in range(repeat):
+        planner = jump_point.JumpPointPlanner(env, obstacle_penalty, repulsion_penalty)
+        start = time.perf_counter()
+        planner.calculate_jump_point_cost_from_robot_to_end(movement)
+        search_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        path, _ = planner.raw_path_finder_from_robot_to_end(movement)
+        path_times.append(time.perf_counter() - start)
+    return {
+        'search': min(search_times),
+        'path': min(path_times),
+        'expanded': planner.context.expanded,
+        'path_length': len(path),
+    }
+
+
+def benchmark_hierarchical_search(env, params, repeat):
+    """
+    Times hierarchical queries on an environment, with the abstract graph built once beforehand.
+
+    Args:
+        env (Environment): The environment to plan on.
+        params (tuple): (obstacle_penalty, repulsion_penalty, movement, k_factor), k_factor is unused.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Best search and extraction times, abstract expansions and path length.
+    """
+    obstacle_penalty, repulsion_penalty, movement, _ = params
+    planner = hierarchical.HierarchicalPlanner(env, obstacle_penalty, repulsion_penalty, movement=movement)
+    planner.build_abstract_graph()
+    search_times, path_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        planner.calculate_hierarchical_cost_from_robot_to_end()
+        search_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        path, _ = planner.raw_path_finder_from_robot_to_end(movement)
+        path_times.append(time.perf_counter() - start)
+    return {
+        'search': min(search_times),
+        'path': min(path_times),
+        'expanded': planner.expanded,
+        'path_length': len(path),
+    }
+
+
+def benchmark_incremental_replanning(env, params, replans, cells=8, seed=0):
+    """
+    Times D* Lite replans while random free cells are blocked and freed again, and checks the
+    robot's cost-to-go after every replan against a fresh search of the changed map.
+
+    The blocked cells are static obstacles, all of them are removed again before returning.
+
+    Args:
+        env (Environment): The environment to plan on.
+        params (tuple): (obstacle_penalty, repulsion_penalty, movement, k_factor), k_factor is unused.
+        replans (int): Number of replans.
+        cells (int, optional): Cells blocked by every other replan. Defaults to 8.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        dict: Best replan and fresh search times, mean expansions per replan and path length.
+
+    Raises:
+        RuntimeError: If a replanned cost differs from the fresh search.
+    """
+    obstacle_penalty, repulsion_penalty, movement, _ = params
+    rng = np.random.default_rng(seed)
+    planner = dstar_lite.IncrementalPathPlanner(env, obstacle_penalty, repulsion_penalty, movement=movement)
+    planner.plan_from_end_to_robot()
+    robot_index = env.robot_y * env.grid_w + env.robot_x
+    replan_times, search_times, expanded = [], [], 0
+    blocked = np.zeros((env.grid_h, env.grid_w), dtype=bool)
+    try:
+        for replan in range(replans):
+            if blocked.any():
+                mask, blocked = blocked, np.zeros_like(blocked)
+                env.remove_static_obstacle_mask(mask)
+            else:
+                free = env.traversal_cost == 0
+                free[env.robot_y, env.robot_x] = free[env.end_y, env.end_x] = False
+                free_y, free_x = np.nonzero(free)
+                chosen = rng.choice(len(free_x), size=min(cells, len(free_x)), replace=False)
+                blocked[free_y[chosen], free_x[chosen]] = True
+                mask = blocked
+                env.put_static_obstacle_mask(mask)
+            changed_y, changed_x = np.nonzero(mask)
+            start = time.perf_counter()
+            before = planner.expanded
+            path, _ = planner.update_cells(zip(changed_x.tolist(), changed_y.tolist()))
+            replan_times.append(time.perf_counter() - start)
+            expanded += planner.expanded - before
+
+            fresh = bstar.PathPlanner(env, obstacle_penalty, repulsion_penalty)
+            start = time.perf_counter()
+            fresh.calculate_non_obstacle_cost_and_heuristics_from_end_to_robot(movement, 0.0, terminate_on='pop')
+            search_times.append(time.perf_counter() - start)
+            replanned, expected = planner.cost_to_go(env.robot_x, env.robot_y), float(fresh.context.costs[robot_index])
+            if math.isfinite(replanned) != math.isfinite(expected) or (math.isfinite(expected) and abs(replanned - expected) > 1e-6):
+                raise RuntimeError(f"replan {replan}: D* Lite cost {replanned} differs from a fresh search {expected}")
+    finally:
+        env.remove_static_obstacle_mask(blocked)
+    return {
+        'replan': min(replan_times),
+        'search': min(search_times),
+        'expanded': expanded / replans,
+        'path_length': len(path),
+    }
+
+
+def print_result(name, result):
+    print(f"{name:<34} search {result['search'] * 1000:9.2f} ms   path {result['path'] * 1000:8.2f} ms   "
+          f"expanded {result['expanded']:7d}   path length {result['path_length']:5d}")
+
+
+def print_replan_result(name, result):
+    print(f"{name:<34} replan {result['replan'] * 1000:9.2f} ms   fresh search {result['search'] * 1000:8.2f} ms   "
+          f"expanded {result['expanded']:7.1f}   path length {result['path_length']:5d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the B* planner on the main.py scenario and .npy maps.')
+    parser.add_argument('files', nargs='*', help='.npy occupancy grids (a synthetic 250x250 map is used if none are given)')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per scenario')
+    parser.add_argument('--replans', type=int, default=20, help='D* Lite replans checked against a fresh search per scenario')
+    parser.add_argument('--terminate-on', choices=['push', 'pop'], default='push', help='stop when the goal is pushed (fast) or popped (optimal)')
+    args = parser.parse_args()
+
+    env = main_scenario_environment()
+    print_result('main.py 50x50', benchmark_search(env, (500.0, 10.0, 'queen', 0.5), args.repeat, args.terminate_on))
+    print_result('main.py 50x50 bidirectional', benchmark_bidirectional_search(env, (500.0, 10.0, 'queen', 0.5), args.repeat))
+    print_result('main.py 50x50 jump point', benchmark_jump_point_search(env, (500.0, 10.0, 'queen', 0.5), args.repeat))
+    print_result('main.py 50x50 hierarchical', benchmark_hierarchical_search(env, (500.0, 10.0, 'queen', 0.5), args.repeat))
+    print_replan_result('main.py 50x50 D* Lite', benchmark_incremental_replanning(env, (500.0, 10.0, 'queen', 0.5), args.replans))
+
+    for file_path in args.files or [None]:
+        planner = npy_scenario_environment(file_path)
+        params = (planner.params.OBSTACLE_PENALTY, planner.params.REPULSION_PENALTY, planner.params.MOVEMENT, planner.params.K_FACTOR)
+        name = file_path or 'synthetic 250x250'
+        print_result(name, benchmark_search(planner.env, params, args.repeat, args.terminate_on))
+        print_result(f'{name} bidirectional', benchmark_bidirectional_search(planner.env, params, args.repeat))
+        if planner.params.MOVEMENT == 'queen':
+            print_result(f'{name} jump point', benchmark_jump_point_search(planner.env, params, args.repeat))
+        if planner.params.MOVEMENT in ('queen', 'rook'):
+            print_result(f'{name} hierarchical', benchmark_hierarchical_search(planner.env, params, args.repeat))
+        print_replan_result(f'{name} D* Lite', benchmark_incremental_replanning(planner.env, params, args.replans))
+
+
+if __name__ == '__main__':
+    main()
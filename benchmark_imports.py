@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Dependencies a headless planner should not load until a function needs them
+HEAVY_MODULES = ['matplotlib', 'matplotlib.pyplot', 'scipy', 'rdp']
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'elapsed': elapsed, 'loaded': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def time_import(module, repeat):
+    """
+    Imports a module in fresh interpreters and times the import statement alone.
+
+    Args:
+        module (str): Dotted name of the module.
+        repeat (int): Number of interpreters started.
+
+    Returns:
+        dict: Best and median import times in seconds, and the heavy modules the import loaded.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    code = MEASURE.format(module=module, heavy=HEAVY_MODULES)
+    times, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.splitlines()[-1])
+        times.append(result['elapsed'])
+        loaded = result['loaded']
+    return {'best': min(times), 'median': statistics.median(times), 'loaded': loaded}
+
+
+def slowest_imports(module, top):
+    """
+    Runs python -X importtime on one import and returns the modules with the largest self time.
+
+    Args:
+        module (str): Dotted name of the module.
+        top (int): Number of modules returned.
+
+    Returns:
+        list: (self time in seconds, module name) pairs, slowest first.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=here, capture_output=True, text=True, check=True).stderr
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        entries.append((int(self_time) / 1e6, name.strip()))
+    return sorted(entries, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the start-up time of the planner modules in fresh interpreters.')
+    parser.add_argument('modules', nargs='*', default=['singaboat_vrx.custom_plan1.path_planning_utils', 'run'], help='modules to import (default: the package and run)')
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per module')
+    parser.add_argument('--top', type=int, default=0, help='also list the N imports with the largest self time')
+    args = parser.parse_args()
+
+    baseline = time_import('math', args.repeat)
+    print(f"{'interpreter baseline (math)':<48} best {baseline['best'] * 1000:8.2f} ms   median {baseline['median'] * 1000:8.2f} ms")
+    for module in args.modules:
+        result = time_import(module, args.repeat)
+        print(f"{module:<48} best {result['best'] * 1000:8.2f} ms   median {result['median'] * 1000:8.2f} ms   "
+              f"loads {', '.join(result['loaded']) or 'none of ' + ', '.join(HEAVY_MODULES)}")
+        for self_time, name in slowest_imports(module, args.top):
+            print(f"    {name:<44} self {self_time * 1000:8.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -98,7 +98,7 @@ if __name__ == '__main__':
     if not isinstance(data.get('obstacles', []), list):
         data['obstacles'] = []
 
-    data['paths'].append(path)
+    data['paths'].append(path.tolist())
     data['obstacles'].append({
         'x': OBSTACLES_X,
         'y': OBSTACLES_Y,
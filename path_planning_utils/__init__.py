@@ -1,8 +1,20 @@
 # __init__.py file for path_planning_utils
 
+from .anytime import *
 from .bi_bstar import *
 from .bstar import *
+from .clearance import *
+from .cost_field_cache import *
+from .dstar_lite import *
 from .dubin import *
 from .environment import *
+from .grid_arrays import *
+from .hierarchical import *
+from .jump_point import *
 from .node import *
 from .post_process import *
+from .priority_queue import *
+from .search_context import *
+from .space_time import *
+from .sweep import *
+from .trajectory_store import *
@@ -0,0 +1,152 @@
+import math
+import time
+import numpy as np
+from dataclasses import dataclass
+from singaboat_vrx.custom_plan1.path_planning_utils.bstar import PathPlanner
+from singaboat_vrx.custom_plan1.path_planning_utils.search_context import SearchContext
+
+
+@dataclass
+class AnytimeResult:
+    """
+    Best route found by an anytime search before its deadline.
+
+    Attributes:
+        path (np.ndarray): (n, 2) array of [x, y] from the robot to the end, empty if none was found.
+        orientation (np.ndarray): (n - 1, 2) array of steps along the path.
+        cost (float): Cost of the path, nan if none was found.
+        bound (float): The path costs at most bound times the optimum.
+        k_factor (float): Heuristic weight of the search that found the path.
+        iterations (int): Completed searches.
+        expanded (int): Nodes expanded over all searches.
+    """
+    path: np.ndarray
+    orientation: np.ndarray
+    cost: float
+    bound: float
+    k_factor: float
+    iterations: int = 0
+    expanded: int = 0
+
+
+class AnytimePlanner(PathPlanner):
+    """
+    ARA*-style anytime search from the end to the robot.
+
+    Nodes are ordered by the usual blend k_factor * cost + (1 - k_factor) * distance,
+    which is weighted A* with weight (1 - k_factor) / k_factor. The first search uses a
+    small k_factor and finds a path quickly. Each later search raises k_factor towards
+    0.5 (plain A*). It reuses the costs found so far and re-expands only the nodes whose
+    cost improved, until the deadline or until the path is optimal.
+
+    Blocked cells (obstacles and repulsion) are impassable, as in the
+    calculate_non_obstacle_* searches.
+    """
+
+    def improve_path(self, context, closed, inconsistent, distance, k_factor, movement, goal, deadline=None):
+        """
+        Runs one weighted search, reusing the costs of the previous ones.
+
+        Returns:
+            bool: False if the deadline stopped the search before its path was final.
+        """
+        costs, parents, open_list = context.costs, context.parents, context.open
+        free = context.static_map.free
+        grid_w = self.environment.grid_w
+        interior = self.get_interior_mask(1)
+        table = self.get_neighbour_table(movement, 1)
+        count = 0
+        while open_list:
+            priority, current = open_list.peek()
+            # NaN (goal not reached yet) fails the comparison and the search goes on
+            if priority >= k_factor * costs[goal]:
+                return True
+            count += 1
+            if deadline is not None and not count & 255 and time.perf_counter() > deadline:
+                return False
+            open_list.pop()
+            closed[current] = 1
+            context.state[current] = SearchContext.CLOSED
+            context.expanded += 1
+            x, y = current % grid_w, current // grid_w
+            k = costs[current]
+            for dx, dy, step_cost, delta in table:
+                if not interior[current] and not self.is_inside_grid(x + dx, y + dy):
+                    continue
+                index = current + delta
+                if not free[index] and index != goal:
+                    continue
+                # True for never reached (NaN) cells too
+                if not k + step_cost >= costs[index]:
+                    costs[index] = k + step_cost
+                    parents[index] = current
+                    if closed[index]:
+                        inconsistent.add(index)
+                    else:
+                        context.state[index] = SearchContext.OPEN
+                        open_list.push(index, k_factor * costs[index] + (1 - k_factor) * distance[index])
+        return True
+
+    def get_suboptimality_bound(self, context, inconsistent, distance, goal, k_factor):
+        # min(weight, g(goal) / min(g + h) over the open and inconsistent nodes)
+        costs = context.costs
+        lower = min((costs[index] + distance[index] for index in inconsistent.union(index for _, index in context.open)), default=math.inf)
+        weight = (1 - k_factor) / k_factor
+        return max(1.0, min(weight, costs[goal] / lower))
+
+    def plan_with_deadline(self, time_limit, movement='queen', k_factor=0.2, k_factor_step=0.1):
+        """
+        Improves the path from the robot to the end until the time limit runs out.
+
+        The first search always completes, so a path is returned whenever one exists.
+
+        Args:
+            time_limit (float): Wall-clock budget in seconds.
+            movement (str, optional): Movement type. Defaults to 'queen'.
+            k_factor (float, optional): Weight of the first search, in (0, 0.5]. Defaults to 0.2 (weight 4).
+            k_factor_step (float, optional): Increase of k_factor per search. Defaults to 0.1.
+
+        Returns:
+            AnytimeResult: The best path so far and its suboptimality bound.
+        """
+        if not 0 < k_factor <= 0.5:
+            raise ValueError(f"k_factor must be in (0, 0.5], got {k_factor}")
+        deadline = time.perf_counter() + time_limit
+        env = self.environment
+        grid_w = env.grid_w
+        static_map = self.get_static_map()
+        y, x = np.indices((static_map.grid_h, static_map.grid_w))
+        distance = np.hypot(x - env.robot_x, y - env.robot_y).ravel().tolist()
+        context = self.context = SearchContext(static_map)
+        start, goal = env.end_y * grid_w + env.end_x, env.robot_y * grid_w + env.robot_x
+        context.costs[start] = 0.0
+        context.state[start] = SearchContext.OPEN
+        context.open.push(start, (1 - k_factor) * distance[start])
+        closed = bytearray(len(context.costs))
+        inconsistent = set()
+
+        empty = np.empty((0, 2), dtype=np.int64)
+        result = AnytimeResult(empty, empty, math.nan, math.inf, k_factor)
+        while True:
+            if not self.improve_path(context, closed, inconsistent, distance, k_factor, movement, goal, deadline if result.iterations else None):
+                break
+            if math.isnan(context.costs[goal]):
+                result.iterations += 1
+                break
+            path = context.trace_parents(env.robot_x, env.robot_y)
+            bound = self.get_suboptimality_bound(context, inconsistent, distance, goal, k_factor)
+            result = AnytimeResult(path, np.diff(path, axis=0), context.costs[goal], bound, k_factor, result.iterations + 1)
+            if bound <= 1.0 or time.perf_counter() > deadline:
+                break
+            # Tighten the weight, reopen the nodes whose cost improved after they were closed
+            # and re-key the open list for the new weight
+            k_factor = min(0.5, k_factor + k_factor_step)
+            reopened = inconsistent.union(index for _, index in context.open)
+            context.open.clear()
+            for index in reopened:
+                context.state[index] = SearchContext.OPEN
+                context.open.push(index, k_factor * context.costs[index] + (1 - k_factor) * distance[index])
+            inconsistent.clear()
+            closed = bytearray(len(context.costs))
+        result.expanded = context.expanded
+        return result
@@ -1,63 +1,150 @@
 import math
-import threading as t
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.bstar import PathPlanner
+from singaboat_vrx.custom_plan1.path_planning_utils.search_context import SearchContext
+
+
+class BidirectionalBstar(PathPlanner):
+    """
+    Bidirectional search that grows one frontier from the end and one from the robot,
+    expanding them alternately until they meet.
+
+    Both sides use the averaged potential p(v) = (h_robot(v) - h_end(v)) / 2: the end
+    side orders its open list by cost + p, the robot side by cost - p. Every step keeps
+    a non-negative reduced cost, so the search can stop as soon as the two smallest
+    priorities add up to the best meeting cost found so far. That cost is then optimal.
+
+    Blocked cells (obstacles and repulsion) are impassable, as in the
+    calculate_non_obstacle_* searches.
+    """
 
-class BidirectionalBstar:
     def __init__(self, environment, obstacle_penalty, repulsion_penalty):
-        self.environment = environment
-        self.obstacle_penalty = obstacle_penalty
-        self.repulsion_penalty = repulsion_penalty
-        self.end_to_robot_open = []
-        self.end_to_robot_closed = []
-        self.robot_to_end_open = []
-        self.robot_to_end_closed = []
-
-    def euclidian_distance(self, x1, y1, x2, y2):
-        return math.sqrt(pow(x2 - x1, 2) + pow(y2 - y1, 2))
-
-    def manhattan_distance(self, x1, y1, x2, y2):
-        return abs(x2 - x1) + abs(y2 - y1)
-
-    def is_inside_grid(self, x, y):
-        return -1 < x < self.environment.grid_w and -1 < y < self.environment.grid_h
-
-    def is_valid(self, x, y):
-        return not self.environment.grid[y][x]['obstacle'] and self.environment.grid[y][x]['k'] is not None and self.environment.grid[y][x]['repulsion_factor'] == 0
-
-    def is_free_to_move(self, x, y):
-        return not self.environment.grid[y][x]['obstacle'] and self.environment.grid[y][x]['repulsion_factor'] == 0
-
-    def is_never_visited(self, x, y):
-        return self.environment.grid[y][x] not in self.open and self.environment.grid[y][x] not in self.closed
-
-    def get_offset_range(self, max_distance):
-        return [i for i in range(-1 * max_distance, max_distance + 1, 1)]
-
-    def find_all_neighbour_offsets(self, movement: str, max_distance: int):
-        if movement == 'queen':
-            moves = [[dx, dy] for dx in self.get_offset_range(max_distance) for dy in self.get_offset_range(max_distance)]
-        elif movement == 'rook':
-            moves = [[dx, dy] for dx in self.get_offset_range(max_distance) for dy in self.get_offset_range(max_distance)]
-            for dx, dy in moves:
-                if dx != 0 and dy != 0:
-                    moves.remove([dx, dy])
-        elif movement == 'bishop':
-            moves = [[dx, dy] for dx in self.get_offset_range(max_distance) for dy in self.get_offset_range(max_distance)]
-            for dx, dy in moves:
-                if dx != dy:
-                    moves.remove([dx, dy])
-        moves.remove([0, 0])
-        return moves
-
-    def update_node_in_open_list(self, x, y, k):
-        for index, _ in enumerate(self.open):
-            if self.open[index]['x'] == x and self.open[index]['y'] == y:
-                self.open[index]['k'] = k
+        super().__init__(environment, obstacle_penalty, repulsion_penalty)
+        self.end_to_robot = None
+        self.robot_to_end = None
+        self.meeting_index = -1
+        self.best_cost = math.inf
+
+    @property
+    def closed(self):
+        if self.end_to_robot is None:
+            return set()
+        return self.end_to_robot.closed | self.robot_to_end.closed
+
+    @property
+    def open_set(self):
+        if self.end_to_robot is None:
+            return set()
+        return self.end_to_robot.open_set | self.robot_to_end.open_set
+
+    @property
+    def expanded(self):
+        if self.end_to_robot is None:
+            return 0
+        return self.end_to_robot.expanded + self.robot_to_end.expanded
+
+    def get_potential(self, static_map, use_heuristic):
+        if not use_heuristic:
+            return [0.0] * (static_map.grid_h * static_map.grid_w)
+        env = self.environment
+        y, x = np.indices((static_map.grid_h, static_map.grid_w))
+        potential = (np.hypot(x - env.robot_x, y - env.robot_y) - np.hypot(x - env.end_x, y - env.end_y)) / 2
+        return potential.ravel().tolist()
+
+    def expand_one_side(self, context, other, sign, potential, movement):
+        # Pops the best node of one side, relaxes its free neighbours and returns the
+        # cheapest meeting (cost, index) seen through its edges
+        costs, parents, state, open_list = context.costs, context.parents, context.state, context.open
+        other_costs, other_state = other.costs, other.state
+        free = context.static_map.free
+        grid_w = self.environment.grid_w
+        _, current = open_list.pop()
+        state[current] = SearchContext.CLOSED
+        context.expanded += 1
+        x, y = current % grid_w, current // grid_w
+        k = costs[current]
+        best, meeting = math.inf, -1
+        interior = self.get_interior_mask(1)[current]
+        for dx, dy, step_cost, delta in self.get_neighbour_table(movement, 1):
+            if not interior and not self.is_inside_grid(x + dx, y + dy):
+                continue
+            index = current + delta
+            if not free[index] and other_state[index] == SearchContext.UNVISITED:
+                continue
+            new_cost = k + step_cost
+            if other_state[index] != SearchContext.UNVISITED and new_cost + other_costs[index] < best:
+                best, meeting = new_cost + other_costs[index], index
+            if not free[index]:
+                # Only the other side's start can be a blocked meeting cell
+                continue
+            if state[index] == SearchContext.UNVISITED:
+                costs[index] = new_cost
+                parents[index] = current
+                state[index] = SearchContext.OPEN
+                open_list.push(index, new_cost + sign * potential[index])
+            elif state[index] == SearchContext.OPEN and new_cost < costs[index]:
+                costs[index] = new_cost
+                parents[index] = current
+                open_list.decrease_key(index, new_cost + sign * potential[index])
+        return best, meeting
+
+    def calculate_cost_and_heuristics_from_both_sides(self, movement='queen', use_heuristic=True):
+        """
+        Runs the bidirectional search between the end and the robot.
+
+        Args:
+            movement (str, optional): Movement type. Defaults to 'queen'.
+            use_heuristic (bool, optional): Guide both sides with the averaged Euclidean potential,
+                otherwise run a plain bidirectional uniform-cost search. Defaults to True.
+
+        Returns:
+            float: Cost of the shortest path, inf if the frontiers never met.
+        """
+        env = self.environment
+        grid_w = env.grid_w
+        static_map = self.get_static_map()
+        potential = self.get_potential(static_map, use_heuristic)
+        end, robot = env.end_y * grid_w + env.end_x, env.robot_y * grid_w + env.robot_x
+        self.end_to_robot = SearchContext(static_map)
+        self.robot_to_end = SearchContext(static_map)
+        for context, start, sign in ((self.end_to_robot, end, 1.0), (self.robot_to_end, robot, -1.0)):
+            context.costs[start] = 0.0
+            context.state[start] = SearchContext.OPEN
+            context.open.push(start, sign * potential[start])
+
+        self.best_cost, self.meeting_index = (0.0, end) if end == robot else (math.inf, -1)
+        sides = ((self.end_to_robot, self.robot_to_end, 1.0), (self.robot_to_end, self.end_to_robot, -1.0))
+        turn = 0
+        while self.end_to_robot.open and self.robot_to_end.open:
+            # p(robot) and p(end) cancel out, so the two top priorities bound every path not found yet
+            if self.end_to_robot.open.peek()[0] + self.robot_to_end.open.peek()[0] >= self.best_cost:
                 break
+            context, other, sign = sides[turn]
+            turn ^= 1
+            cost, meeting = self.expand_one_side(context, other, sign, potential, movement)
+            if cost < self.best_cost:
+                self.best_cost, self.meeting_index = cost, meeting
+        return self.best_cost
+
+    def raw_path_finder_from_robot_to_end(self, movement='queen', vectorized=False, context=None):
+        """
+        Joins the parent chains of both sides at the meeting cell.
 
-    def add_repulsion_penalty(self):
-        for y in range(self.environment.grid_h):
-            for x in range(self.environment.grid_w):
-                self.environment.grid[y][x]['k'] = self.environment.grid[y][x]['k'] + (self.environment.grid[y][x]['repulsion_factor'] * self.repulsion_penalty) if self.environment.grid[y][x]['k'] is not None else self.environment.grid[y][x]['k']
+        Returns:
+            tuple: (path, orientation) arrays from the robot to the end, both empty if the search failed.
+        """
+        if context is not None:
+            return super().raw_path_finder_from_robot_to_end(movement, vectorized, context)
+        if self.meeting_index < 0:
+            return np.empty((0, 2), dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+        grid_w = self.environment.grid_w
+        x, y = self.meeting_index % grid_w, self.meeting_index // grid_w
+        path = np.concatenate((self.robot_to_end.trace_parents(x, y)[::-1], self.end_to_robot.trace_parents(x, y)[1:]))
+        return path, np.diff(path, axis=0)
 
-    def calculate_cost_and_heuristics_from_both_sides(self):
-        pass
+    def raw_path_finder_from_end_to_robot(self, movement='queen', vectorized=False, context=None):
+        if context is not None:
+            return super().raw_path_finder_from_end_to_robot(movement, vectorized, context)
+        path, _ = self.raw_path_finder_from_robot_to_end(movement)
+        path = path[::-1]
+        return path, np.diff(path, axis=0)
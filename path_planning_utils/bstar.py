@@ -1,19 +1,40 @@
 import math
-from singaboat_vrx.custom_plan1.path_planning_utils import dubin
-import heapq
-from matplotlib import pyplot as plt
+from singaboat_vrx.custom_plan1.path_planning_utils import dubin, sweep
+from singaboat_vrx.custom_plan1.path_planning_utils.cost_field_cache import CostFieldCache
+from singaboat_vrx.custom_plan1.path_planning_utils.search_context import SearchContext, StaticMap
 import numpy as np
 
 class PathPlanner:
-    def __init__(self, environment, obstacle_penalty: int, repulsion_penalty: int):
+    def __init__(self, environment, obstacle_penalty: int, repulsion_penalty: int, cost_field_cache=None):
         self.environment = environment
        
         self.obstacle_penalty = obstacle_penalty
         self.repulsion_penalty = repulsion_penalty
-        self.open = []
-        self.closed = set()
-        self.open_set = set()
+        # Complete cost-to-go fields per goal, may be shared between planners
+        self.cost_field_cache = cost_field_cache if cost_field_cache is not None else CostFieldCache()
 
+        # Static layers shared by every query, the environment version they were taken
+        # at, and the state of the last query run through the calculate_* methods
+        self.static_map = None
+        self.static_map_version = None
+        self.context = None
+
+        # (movement, max_distance) -> ((dx, dy, step_cost, flat_delta), ...)
+        self.neighbour_tables = {}
+        # max_distance -> flat mask of cells whose whole neighbourhood is inside the grid
+        self.interior_masks = {}
+
+    @property
+    def open(self):
+        return self.context.open if self.context is not None else None
+
+    @property
+    def closed(self):
+        return self.context.closed if self.context is not None else set()
+
+    @property
+    def open_set(self):
+        return self.context.open_set if self.context is not None else set()
 
     def euclidian_distance(self, x1, y1, x2, y2):
         return math.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
@@ -25,15 +46,15 @@ class PathPlanner:
         return 0 <= x < self.environment.grid_w and 0 <= y < self.environment.grid_h
 
     def is_valid(self, x, y):
-        cell = self.environment.grid[y][x]
-        return not cell.obstacle and cell.k is not None and cell.repulsion_factor == 0
+        if self.context is None or math.isnan(self.context.costs[y * self.environment.grid_w + x]):
+            return False
+        return self.is_free_to_move(x, y)
 
     def is_free_to_move(self, x, y):
-        cell = self.environment.grid[y][x]
-        return not cell.obstacle and cell.repulsion_factor == 0
+        return not self.environment.traversal_cost[y, x]
 
     def is_never_visited(self, x, y):
-        return (x, y) not in self.open_set and (x, y) not in self.closed
+        return self.context is None or self.context.state[y * self.environment.grid_w + x] == SearchContext.UNVISITED
 
     def get_offset_range(self, max_distance):
         return range(-max_distance, max_distance + 1)
@@ -47,277 +68,293 @@ class PathPlanner:
             return [[dx, dy] for dx in self.get_offset_range(max_distance) for dy in self.get_offset_range(max_distance) if abs(dx) == abs(dy)]
         return []
 
-    def update_node_in_open_list(self, x, y, k):
-        for node in self.open:
-            if node[1].x == x and node[1].y == y:
-                node[1].k = k
-                heapq.heapify(self.open)
-                break
-
-    def add_repulsion_penalty(self):
-        for row in self.environment.grid:
-            for cell in row:
-                if cell.k is not None:
-                    cell.k += cell.repulsion_factor * self.repulsion_penalty
+    def get_neighbour_table(self, movement, max_distance):
+        key = (movement, max_distance)
+        table = self.neighbour_tables.get(key)
+        if table is None:
+            grid_w = self.environment.grid_w
+            table = tuple((dx, dy, math.hypot(dx, dy), dy * grid_w + dx) for dx, dy in self.find_all_neighbour_offsets(movement, max_distance))
+            self.neighbour_tables[key] = table
+        return table
+
+    def get_interior_mask(self, max_distance):
+        mask = self.interior_masks.get(max_distance)
+        if mask is None:
+            grid_h, grid_w = self.environment.grid_h, self.environment.grid_w
+            interior = np.zeros((grid_h, grid_w), dtype=bool)
+            interior[max_distance:grid_h - max_distance, max_distance:grid_w - max_distance] = True
+            mask = interior.ravel().tolist()
+            self.interior_masks[max_distance] = mask
+        return mask
+
+    def load_static_map(self, static_map=None):
+        # Snapshot of the environment shared by all following queries, or a prebuilt one
+        # such as a map attached from shared memory
+        self.static_map = static_map or StaticMap(self.environment.get_grid_arrays())
+        self.static_map_version = self.environment.version
+        return self.static_map
+
+    def get_static_map(self):
+        # The cached snapshot, reloaded only once the environment has changed since it was taken
+        if self.static_map is None or self.static_map_version != self.environment.version:
+            return self.load_static_map()
+        return self.static_map
+
+    def get_distance_field(self, static_map, goal_x, goal_y):
+        if (goal_x, goal_y) == (self.environment.robot_x, self.environment.robot_y):
+            return static_map.robot_distance
+        if (goal_x, goal_y) == (self.environment.end_x, self.environment.end_y):
+            return static_map.end_distance
+        y, x = np.indices((static_map.grid_h, static_map.grid_w))
+        return np.hypot(x - goal_x, y - goal_y).ravel().tolist()
+
+    def put_costs_on_environment(self, context=None):
+        # Copies the costs of a query onto the environment grid, e.g. for plot_environment_on_grid
+        context = context or self.context
+        self.environment.put_costs_on_grid(context.cost_array())
+
+    def update_node_in_open_list(self, x, y, k, distance, k_factor, o_factor=0.0, context=None):
+        context = context or self.context
+        index = y * self.environment.grid_w + x
+        if index in context.open:
+            context.costs[index] = k
+            context.open.decrease_key(index, self.weighted_priority(context, index, distance, k_factor, o_factor))
+
+    def get_blocked_cost(self, traversal_cost):
+        # Cost given to a blocked cell when include_blocked lets the search enter it
+        if traversal_cost == math.inf:
+            return self.obstacle_penalty
+        return self.obstacle_penalty + traversal_cost * self.repulsion_penalty
 
     def sort_based_on_weighted_distance_to_robot_and_heuristic(self, node, k_factor):
-        return (k_factor * node.k) + ((1 - k_factor) * node.robot_distance)
+        return (k_factor * node.k) + ((1 - k_factor) * self.environment.robot_distance[node.y, node.x])
 
     def sort_based_on_weighted_distance_to_end_and_heuristic(self, node, k_factor):
-        return (k_factor * node.k) + ((1 - k_factor) * node.end_distance)
+        return (k_factor * node.k) + ((1 - k_factor) * self.environment.end_distance[node.y, node.x])
 
     def sort_based_on_weighted_distance_to_robot_and_heuristic_and_obstacle(self, node, k_factor, o_factor):
-        return (k_factor * node.k) + ((1 - k_factor) * node.robot_distance) + (o_factor * node.total_obstacle_distance)
+        return (k_factor * node.k) + ((1 - k_factor) * self.environment.robot_distance[node.y, node.x]) + (o_factor * node.total_obstacle_distance)
 
     def sort_based_on_weighted_distance_to_end_and_heuristic_and_obstacle(self, node, k_factor, o_factor):
-        return (k_factor * node.k) + ((1 - k_factor) * node.end_distance) + (o_factor * node.total_obstacle_distance)
+        return (k_factor * node.k) + ((1 - k_factor) * self.environment.end_distance[node.y, node.x]) + (o_factor * node.total_obstacle_distance)
+
+    def weighted_priority(self, context, index, distance, k_factor, o_factor):
+        # Same blend as the sort_based_on_weighted_distance_* helpers, read from the flat arrays
+        priority = (k_factor * context.costs[index]) + ((1 - k_factor) * distance[index])
+        if o_factor:
+            priority += o_factor * context.static_map.total_obstacle_distance[index]
+        return priority
+
+    def expand_neighbours(self, context, x, y, movement, distance, k_factor, o_factor=0.0, include_blocked=False):
+        costs, parents, state, open_list = context.costs, context.parents, context.state, context.open
+        traversal_cost = context.static_map.traversal_cost
+        current = y * self.environment.grid_w + x
+        k = costs[current]
+        # Cells away from the border skip the bounds test entirely
+        interior = self.get_interior_mask(1)[current]
+        for dx, dy, step_cost, delta in self.get_neighbour_table(movement, 1):
+            if not interior and not self.is_inside_grid(x + dx, y + dy):
+                continue
+            index = current + delta
+            if not traversal_cost[index]:
+                if state[index] == SearchContext.UNVISITED:
+                    costs[index] = k + step_cost
+                    parents[index] = current
+                    state[index] = SearchContext.OPEN
+                    open_list.push(index, self.weighted_priority(context, index, distance, k_factor, o_factor))
+                elif state[index] == SearchContext.OPEN and k + step_cost < costs[index]:
+                    parents[index] = current
+                    self.update_node_in_open_list(x + dx, y + dy, k + step_cost, distance, k_factor, o_factor, context)
+            elif include_blocked and state[index] == SearchContext.UNVISITED:
+                costs[index] = self.get_blocked_cost(traversal_cost[index])
+                parents[index] = current
+                state[index] = SearchContext.OPEN
+                open_list.push(index, self.weighted_priority(context, index, distance, k_factor, o_factor))
+
+    def pop_node_from_open_list(self, context):
+        grid_w = self.environment.grid_w
+        _, top_index = context.open.pop()
+        context.state[top_index] = SearchContext.CLOSED
+        context.expanded += 1
+        return top_index % grid_w, top_index // grid_w
+
+    def calculate_cost_and_heuristics(self, context, start_x, start_y, goal_x, goal_y, movement, distance, k_factor, o_factor=0.0, include_blocked=False, terminate_on='push'):
+        # terminate_on='push' stops as soon as the goal enters the open list (fast),
+        # terminate_on='pop' stops when it is popped, so its cost is final (optimal),
+        # terminate_on='exhaust' runs until the open list is empty (complete cost field)
+        if terminate_on not in ('push', 'pop', 'exhaust'):
+            raise ValueError(f"terminate_on must be 'push', 'pop' or 'exhaust', got {terminate_on!r}")
+        grid_w = self.environment.grid_w
+        start, goal = start_y * grid_w + start_x, goal_y * grid_w + goal_x
+        context.costs[start] = 0
+        context.state[start] = SearchContext.OPEN
+        context.open.push(start, 0)
+        while context.open:
+            if terminate_on == 'push' and context.state[goal] != SearchContext.UNVISITED:
+                break
+            x, y = self.pop_node_from_open_list(context)
+            if terminate_on == 'pop' and (x, y) == (goal_x, goal_y):
+                break
+            self.expand_neighbours(context, x, y, movement, distance, k_factor, o_factor, include_blocked)
+        return context
+
+    def plan(self, start_x, start_y, goal_x, goal_y, movement='queen', k_factor=0.5, o_factor=0.0, include_blocked=True, terminate_on='push'):
+        # Runs one query in its own SearchContext and leaves the planner untouched, so
+        # queries against the same prepared environment can run concurrently
+        static_map = self.get_static_map()
+        distance = self.get_distance_field(static_map, goal_x, goal_y)
+        return self.calculate_cost_and_heuristics(SearchContext(static_map), start_x, start_y, goal_x, goal_y, movement, distance, k_factor, o_factor, include_blocked, terminate_on)
+
+    def calculate_cost_to_go(self, goal_x=None, goal_y=None, movement='queen', include_blocked=True):
+        # Complete cost-to-go field of a goal (the end by default), searched in cost order
+        # until every reachable cell is closed and cached by goal and map fingerprint.
+        # Any start can then be answered by extract_path / raw_path_finder_from_robot_to_end.
+        # The fingerprint is taken from the live traversal cost, so cells changed without
+        # going through the environment's put_* methods still miss the cache.
+        env = self.environment
+        if goal_x is None or goal_y is None:
+            goal_x, goal_y = env.end_x, env.end_y
+        static_map = self.get_static_map()
+        fingerprint = StaticMap.get_fingerprint(env.grid_h, env.grid_w, env.traversal_cost)
+        if fingerprint != static_map.fingerprint():
+            static_map = self.load_static_map()
+        key = (goal_x, goal_y, movement, include_blocked, self.obstacle_penalty, self.repulsion_penalty, fingerprint)
+        context = self.cost_field_cache.get(key)
+        if context is None:
+            context = SearchContext(static_map)
+            self.calculate_cost_and_heuristics(context, goal_x, goal_y, goal_x, goal_y, movement, static_map.robot_distance, 1.0, include_blocked=include_blocked, terminate_on='exhaust')
+            self.cost_field_cache.put(key, context.freeze())
+        self.context = context
+        return context
+
+    def new_search_context(self):
+        self.context = SearchContext(self.get_static_map())
+        return self.context
 
     def expand_all_neighbours_from_end_to_robot(self, x, y, movement, k_factor):
-        for dx, dy in self.find_all_neighbour_offsets(movement, 1):
-            index_x, index_y = x + dx, y + dy
-            if self.is_inside_grid(index_x, index_y):
-                if self.is_free_to_move(index_x, index_y):
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.environment.grid[y][x].k + self.euclidian_distance(x, y, index_x, index_y)
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_robot_and_heuristic(self.environment.grid[index_y][index_x], k_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-                    else:
-                        new_k = self.environment.grid[y][x].k + self.euclidian_distance(0, 0, dx, dy)
-                        if new_k < self.environment.grid[index_y][index_x].k:
-                            self.update_node_in_open_list(index_x, index_y, new_k)
-                else:
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.obstacle_penalty
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_robot_and_heuristic(self.environment.grid[index_y][index_x], k_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-        top_node = heapq.heappop(self.open)[1]
-        self.open_set.remove((top_node.x, top_node.y))
-        return top_node
-
-    def calculate_all_cost_and_heuristics_from_end_to_robot(self, movement, k_factor):
-        x, y = self.environment.end_x, self.environment.end_y
-        self.environment.grid[y][x].k = 0
-        self.environment.grid[y][x].b = None
-        heapq.heappush(self.open, (0, self.environment.grid[y][x]))
-        self.open_set.add((x, y))
-        while True:
-            if any((node.x == self.environment.robot_x and node.y == self.environment.robot_y) for _, node in self.open):
-                break
-            else:
-                top_node = self.expand_all_neighbours_from_end_to_robot(x, y, movement, k_factor)
-                self.closed.add((top_node.x, top_node.y))
-                if self.open:
-                    x, y = self.open[0][1].x, self.open[0][1].y
-        self.add_repulsion_penalty()
+        self.expand_neighbours(self.context, x, y, movement, self.context.static_map.robot_distance, k_factor, include_blocked=True)
+
+    def calculate_all_cost_and_heuristics_from_end_to_robot(self, movement, k_factor, terminate_on='push'):
+        context = self.new_search_context()
+        self.calculate_cost_and_heuristics(context, self.environment.end_x, self.environment.end_y, self.environment.robot_x, self.environment.robot_y, movement, context.static_map.robot_distance, k_factor, include_blocked=True, terminate_on=terminate_on)
 
     def expand_all_neighbours_from_robot_to_end(self, x, y, movement, k_factor):
-        for dx, dy in self.find_all_neighbour_offsets(movement, 1):
-            index_x, index_y = x + dx, y + dy
-            if self.is_inside_grid(index_x, index_y):
-                if self.is_free_to_move(index_x, index_y):
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.environment.grid[y][x].k + self.euclidian_distance(x, y, index_x, index_y)
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_end_and_heuristic(self.environment.grid[index_y][index_x], k_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-                    else:
-                        new_k = self.environment.grid[y][x].k + self.euclidian_distance(0, 0, dx, dy)
-                        if new_k < self.environment.grid[index_y][index_x].k:
-                            self.update_node_in_open_list(index_x, index_y, new_k)
-                else:
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.obstacle_penalty
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_end_and_heuristic(self.environment.grid[index_y][index_x], k_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-        top_node = heapq.heappop(self.open)[1]
-        self.open_set.remove((top_node.x, top_node.y))
-        return top_node
-
-    def calculate_all_cost_and_heuristics_from_robot_to_end(self, movement, k_factor):
-        x, y = self.environment.robot_x, self.environment.robot_y
-        self.environment.grid[y][x].k = 0
-        self.environment.grid[y][x].b = None
-        heapq.heappush(self.open, (0, self.environment.grid[y][x]))
-        self.open_set.add((x, y))
-        while True:
-            if any((node.x == self.environment.end_x and node.y == self.environment.end_y) for _, node in self.open):
-                break
-            else:
-                top_node = self.expand_all_neighbours_from_robot_to_end(x, y, movement, k_factor)
-                self.closed.add((top_node.x, top_node.y))
-                if self.open:
-                    x, y = self.open[0][1].x, self.open[0][1].y
-        self.add_repulsion_penalty()
+        self.expand_neighbours(self.context, x, y, movement, self.context.static_map.end_distance, k_factor, include_blocked=True)
+
+    def calculate_all_cost_and_heuristics_from_robot_to_end(self, movement, k_factor, terminate_on='push'):
+        context = self.new_search_context()
+        self.calculate_cost_and_heuristics(context, self.environment.robot_x, self.environment.robot_y, self.environment.end_x, self.environment.end_y, movement, context.static_map.end_distance, k_factor, include_blocked=True, terminate_on=terminate_on)
 
     def expand_non_obstacle_neighbours_from_end_to_robot(self, x, y, movement, k_factor):
-        for dx, dy in self.find_all_neighbour_offsets(movement, 1):
-            index_x, index_y = x + dx, y + dy
-            if self.is_inside_grid(index_x, index_y):
-                if self.is_free_to_move(index_x, index_y):
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.environment.grid[y][x].k + self.euclidian_distance(x, y, index_x, index_y)
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_robot_and_heuristic(self.environment.grid[index_y][index_x], k_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-                    else:
-                        new_k = self.environment.grid[y][x].k + self.euclidian_distance(0, 0, dx, dy)
-                        if new_k < self.environment.grid[index_y][index_x].k:
-                            self.update_node_in_open_list(index_x, index_y, new_k)
-        top_node = heapq.heappop(self.open)[1]
-        self.open_set.remove((top_node.x, top_node.y))
-        return top_node
-
-    def calculate_non_obstacle_cost_and_heuristics_from_end_to_robot(self, movement, k_factor):
-        x, y = self.environment.end_x, self.environment.end_y
-        self.environment.grid[y][x].k = 0
-        self.environment.grid[y][x].b = None
-        heapq.heappush(self.open, (0, self.environment.grid[y][x]))
-        self.open_set.add((x, y))
-        while True:
-            if any((node.x == self.environment.robot_x and node.y == self.environment.robot_y) for _, node in self.open):
-                break
-            else:
-                top_node = self.expand_non_obstacle_neighbours_from_end_to_robot(x, y, movement, k_factor)
-                self.closed.add((top_node.x, top_node.y))
-                if self.open:
-                    x, y = self.open[0][1].x, self.open[0][1].y
-        self.add_repulsion_penalty()
+        self.expand_neighbours(self.context, x, y, movement, self.context.static_map.robot_distance, k_factor)
+
+    def calculate_non_obstacle_cost_and_heuristics_from_end_to_robot(self, movement, k_factor, terminate_on='push'):
+        context = self.new_search_context()
+        self.calculate_cost_and_heuristics(context, self.environment.end_x, self.environment.end_y, self.environment.robot_x, self.environment.robot_y, movement, context.static_map.robot_distance, k_factor, terminate_on=terminate_on)
 
     def expand_non_obstacle_neighbours_from_robot_to_end(self, x, y, movement, k_factor):
-        for dx, dy in self.find_all_neighbour_offsets(movement, 1):
-            index_x, index_y = x + dx, y + dy
-            if self.is_inside_grid(index_x, index_y):
-                if self.is_free_to_move(index_x, index_y):
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.environment.grid[y][x].k + self.euclidian_distance(x, y, index_x, index_y)
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_end_and_heuristic(self.environment.grid[index_y][index_x], k_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-                    else:
-                        new_k = self.environment.grid[y][x].k + self.euclidian_distance(0, 0, dx, dy)
-                        if new_k < self.environment.grid[index_y][index_x].k:
-                            self.update_node_in_open_list(index_x, index_y, new_k)
-        top_node = heapq.heappop(self.open)[1]
-        self.open_set.remove((top_node.x, top_node.y))
-        return top_node
-
-    def calculate_non_obstacle_cost_and_heuristics_from_robot_to_end(self, movement, k_factor):
-        x, y = self.environment.robot_x, self.environment.robot_y
-        self.environment.grid[y][x].k = 0
-        self.environment.grid[y][x].b = None
-        heapq.heappush(self.open, (0, self.environment.grid[y][x]))
-        self.open_set.add((x, y))
-        while True:
-            if any((node.x == self.environment.end_x and node.y == self.environment.end_y) for _, node in self.open):
-                break
-            else:
-                top_node = self.expand_non_obstacle_neighbours_from_robot_to_end(x, y, movement, k_factor)
-                self.closed.add((top_node.x, top_node.y))
-                if self.open:
-                    x, y = self.open[0][1].x, self.open[0][1].y
-        self.add_repulsion_penalty()
+        self.expand_neighbours(self.context, x, y, movement, self.context.static_map.end_distance, k_factor)
+
+    def calculate_non_obstacle_cost_and_heuristics_from_robot_to_end(self, movement, k_factor, terminate_on='push'):
+        context = self.new_search_context()
+        self.calculate_cost_and_heuristics(context, self.environment.robot_x, self.environment.robot_y, self.environment.end_x, self.environment.end_y, movement, context.static_map.end_distance, k_factor, terminate_on=terminate_on)
 
     def expand_neighbours_from_end_to_robot(self, x, y, movement, k_factor, o_factor):
-        for dx, dy in self.find_all_neighbour_offsets(movement, 1):
-            index_x, index_y = x + dx, y + dy
-            if self.is_inside_grid(index_x, index_y):
-                if self.is_free_to_move(index_x, index_y):
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.environment.grid[y][x].k + self.euclidian_distance(x, y, index_x, index_y)
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_robot_and_heuristic_and_obstacle(self.environment.grid[index_y][index_x], k_factor, o_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-                    else:
-                        new_k = self.environment.grid[y][x].k + self.euclidian_distance(0, 0, dx, dy)
-                        if new_k < self.environment.grid[index_y][index_x].k:
-                            self.update_node_in_open_list(index_x, index_y, new_k)
-        top_node = heapq.heappop(self.open)[1]
-        self.open_set.remove((top_node.x, top_node.y))
-        return top_node
-
-    def calculate_cost_and_heuristics_from_end_to_robot(self, movement, k_factor, o_factor):
-        x, y = self.environment.end_x, self.environment.end_y
-        self.environment.grid[y][x].k = 0
-        self.environment.grid[y][x].b = None
-        heapq.heappush(self.open, (0, self.environment.grid[y][x]))
-        self.open_set.add((x, y))
-        while True:
-            if any((node.x == self.environment.robot_x and node.y == self.environment.robot_y) for _, node in self.open):
-                break
-            else:
-                top_node = self.expand_neighbours_from_end_to_robot(x, y, movement, k_factor, o_factor)
-                self.closed.add((top_node.x, top_node.y))
-                if self.open:
-                    x, y = self.open[0][1].x, self.open[0][1].y
-        self.add_repulsion_penalty()
+        self.expand_neighbours(self.context, x, y, movement, self.context.static_map.robot_distance, k_factor, o_factor)
+
+    def calculate_cost_and_heuristics_from_end_to_robot(self, movement, k_factor, o_factor, terminate_on='push'):
+        context = self.new_search_context()
+        self.calculate_cost_and_heuristics(context, self.environment.end_x, self.environment.end_y, self.environment.robot_x, self.environment.robot_y, movement, context.static_map.robot_distance, k_factor, o_factor, terminate_on=terminate_on)
 
     def expand_neighbours_from_robot_to_end(self, x, y, movement, k_factor, o_factor):
-        for dx, dy in self.find_all_neighbour_offsets(movement, 1):
-            index_x, index_y = x + dx, y + dy
-            if self.is_inside_grid(index_x, index_y):
-                if self.is_free_to_move(index_x, index_y):
-                    if self.is_never_visited(index_x, index_y):
-                        self.environment.grid[index_y][index_x].k = self.environment.grid[y][x].k + self.euclidian_distance(x, y, index_x, index_y)
-                        heapq.heappush(self.open, (self.sort_based_on_weighted_distance_to_robot_and_heuristic_and_obstacle(self.environment.grid[index_y][index_x], k_factor, o_factor), self.environment.grid[index_y][index_x]))
-                        self.open_set.add((index_x, index_y))
-                    else:
-                        new_k = self.environment.grid[y][x].k + self.euclidian_distance(0, 0, dx, dy)
-                        if new_k < self.environment.grid[index_y][index_x].k:
-                            self.update_node_in_open_list(index_x, index_y, new_k)
-        top_node = heapq.heappop(self.open)[1]
-        self.open_set.remove((top_node.x, top_node.y))
-        return top_node
-
-    def calculate_cost_and_heuristics_from_robot_to_end(self, movement, k_factor, o_factor):
-        x, y = self.environment.robot_x, self.environment.robot_y
-        self.environment.grid[y][x].k = 0
-        self.environment.grid[y][x].b = None
-        heapq.heappush(self.open, (0, self.environment.grid[y][x]))
-        self.open_set.add((x, y))
-        while True:
-            if any((node.x == self.environment.end_x and node.y == self.environment.end_y) for _, node in self.open):
-                break
-            else:
-                top_node = self.expand_neighbours_from_robot_to_end(x, y, movement, k_factor, o_factor)
-                self.closed.add((top_node.x, top_node.y))
-                if self.open:
-                    x, y = self.open[0][1].x, self.open[0][1].y
-        self.add_repulsion_penalty()
-
-    def raw_path_finder_from_robot_to_end(self, movement):
-        path = []
-        orientations = []
-        x, y = self.environment.robot_x, self.environment.robot_y
-        error_flag = 0
-        while True:
-            path.append([x, y])
-            if x == self.environment.end_x and y == self.environment.end_y:
-                break
-            neighbours = [[x + dx, y + dy] for dx, dy in self.find_all_neighbour_offsets(movement, 1) if self.is_inside_grid(x + dx, y + dy) and self.is_valid(x + dx, y + dy) and [x + dx, y + dy] not in path]
-            neighbours.sort(key=lambda a: self.environment.grid[a[1]][a[0]].k)
-            if len(neighbours)>0:
-                dx, dy = neighbours[0][0] - x, neighbours[0][1] - y
-                orientations.append([dx, dy])
-                x, y = neighbours[0]
-            else:
-                error_flag = 1
-                break
-        if error_flag:
-            return [],[]
-        return path, orientations
-
-    def raw_path_finder_from_end_to_robot(self, movement):
-        path = []
-        orientations = []
-        x, y = self.environment.end_x, self.environment.end_y
-        while True:
-            path.append([x, y])
-            if x == self.environment.robot_x and y == self.environment.robot_y:
-                break
-            neighbours = [[x + dx, y + dy] for dx, dy in self.find_all_neighbour_offsets(movement, 1) if self.is_inside_grid(x + dx, y + dy) and self.is_valid(x + dx, y + dy) and [x + dx, y + dy] not in path]
-            neighbours.sort(key=lambda a: self.environment.grid[a[1]][a[0]].k)
-            dx, dy = neighbours[0][0] - x, neighbours[0][1] - y
-            orientations.append([dx, dy])
-            x, y = neighbours[0]
-        return path, orientations
+        self.expand_neighbours(self.context, x, y, movement, self.context.static_map.end_distance, k_factor, o_factor)
+
+    def calculate_cost_and_heuristics_from_robot_to_end(self, movement, k_factor, o_factor, terminate_on='push'):
+        context = self.new_search_context()
+        self.calculate_cost_and_heuristics(context, self.environment.robot_x, self.environment.robot_y, self.environment.end_x, self.environment.end_y, movement, context.static_map.end_distance, k_factor, o_factor, terminate_on=terminate_on)
+
+    def get_descent_field(self, movement, context=None):
+        # Steepest-descent successor of every cell over the k field, computed for the whole
+        # grid at once: the valid neighbour with the lowest k (first in table order on ties)
+        context = context or self.context
+        grid_h, grid_w = self.environment.grid_h, self.environment.grid_w
+        costs = context.cost_array()
+        valid = np.array(context.static_map.free, dtype=bool).reshape(grid_h, grid_w) & ~np.isnan(costs)
+        padded = np.pad(np.where(valid, costs, np.inf), 1, constant_values=np.inf)
+        flat_index = np.arange(grid_h * grid_w).reshape(grid_h, grid_w)
+        best = np.full((grid_h, grid_w), np.inf)
+        successor = np.full((grid_h, grid_w), -1)
+        for dx, dy, _, delta in self.get_neighbour_table(movement, 1):
+            shifted = padded[1 + dy:1 + dy + grid_h, 1 + dx:1 + dx + grid_w]
+            better = shifted < best
+            best = np.where(better, shifted, best)
+            successor = np.where(better, flat_index + delta, successor)
+        return successor.ravel()
+
+    def descend_cost_field(self, start_x, start_y, goal_x, goal_y, movement, context=None):
+        # Greedy walk to the valid, not yet visited neighbour with the lowest k
+        context = context or self.context
+        grid_w = self.environment.grid_w
+        costs, free = context.costs, context.static_map.free
+        interior = self.get_interior_mask(1)
+        table = self.get_neighbour_table(movement, 1)
+        current, goal = start_y * grid_w + start_x, goal_y * grid_w + goal_x
+        path = [current]
+        visited = {current}
+        while current != goal:
+            x, y = current % grid_w, current // grid_w
+            best, best_k = -1, math.inf
+            for dx, dy, _, delta in table:
+                if not interior[current] and not self.is_inside_grid(x + dx, y + dy):
+                    continue
+                index = current + delta
+                # NaN costs (never reached) fail the comparison and are skipped
+                if free[index] and costs[index] < best_k and index not in visited:
+                    best, best_k = index, costs[index]
+            if best < 0:
+                return None
+            current = best
+            path.append(current)
+            visited.add(current)
+        return path
+
+    def follow_descent_field(self, start_x, start_y, goal_x, goal_y, movement, context=None):
+        grid_w = self.environment.grid_w
+        successor = self.get_descent_field(movement, context).tolist()
+        current, goal = start_y * grid_w + start_x, goal_y * grid_w + goal_x
+        path = [current]
+        visited = {current}
+        while current != goal:
+            current = successor[current]
+            if current < 0 or current in visited:
+                return None
+            path.append(current)
+            visited.add(current)
+        return path
+
+    def extract_path(self, start_x, start_y, goal_x, goal_y, movement, vectorized=False, context=None):
+        context = context or self.context
+        path = None
+        if context is not None and vectorized:
+            path = self.follow_descent_field(start_x, start_y, goal_x, goal_y, movement, context)
+        if context is not None and path is None:
+            # The pure descent cannot step around plateaus, the greedy walk can
+            path = self.descend_cost_field(start_x, start_y, goal_x, goal_y, movement, context)
+        if path is None:
+            return np.empty((0, 2), dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+        grid_w = self.environment.grid_w
+        indices = np.array(path, dtype=np.int64)
+        path = np.stack((indices % grid_w, indices // grid_w), axis=1)
+        return path, np.diff(path, axis=0)
+
+    def raw_path_finder_from_robot_to_end(self, movement, vectorized=False, context=None):
+        return self.extract_path(self.environment.robot_x, self.environment.robot_y, self.environment.end_x, self.environment.end_y, movement, vectorized, context)
+
+    def raw_path_finder_from_end_to_robot(self, movement, vectorized=False, context=None):
+        return self.extract_path(self.environment.end_x, self.environment.end_y, self.environment.robot_x, self.environment.robot_y, movement, vectorized, context)
 
     def find_segments_in_path(self, path, orientation):
+        path, orientation = np.asarray(path).tolist(), np.asarray(orientation).tolist()
         segments = [[path[0]]]
         previous_yaw = orientation[0]
         for index, yaw in enumerate(orientation[1:], 1):
@@ -334,48 +371,51 @@ class PathPlanner:
             x, y = self.environment.robot_x, self.environment.robot_y
             while (x, y) != (self.environment.end_x, self.environment.end_y):
                 path.append((x, y))
-                neighbours = [(x + dx, y + dy) for dx, dy in self.find_all_neighbour_offsets(movement, 1)
+                neighbours = [(x + dx, y + dy) for dx, dy, _, _ in self.get_neighbour_table(movement, 1)
                               if self.is_inside_grid(x + dx, y + dy) and self.is_valid(x + dx, y + dy)]
                 if not neighbours:
                     break
-                neighbours.sort(key=lambda n: self.environment.grid[n[1]][n[0]].k)
+                neighbours.sort(key=lambda n: self.context.costs[n[1] * self.environment.grid_w + n[0]])
                 x, y = neighbours[0]
             path.append((self.environment.end_x, self.environment.end_y))
             return path
 
-    def plot_multiple_shortest_paths(self, num_paths=5, movement='queen'):
-        all_paths = []
-        heuristic_weights = np.linspace(0.4, 0.6, num_paths)  # Slightly vary the heuristic weight
+    def sweep_k_factors(self, k_factors=None, num_paths=5, movement='queen', terminate_on='push', max_workers=None):
+        # Alternative routes from one search per heuristic weight, run in a process pool
+        # for large sweeps; defaults to the np.linspace(0.4, 0.6, num_paths) sweep
+        if k_factors is None:
+            k_factors = np.linspace(0.4, 0.6, num_paths)
+        return sweep.sweep_k_factors(self, k_factors, movement, terminate_on, max_workers)
+
+    def plot_multiple_shortest_paths(self, num_paths=5, movement='queen', candidates=None, max_workers=1):
+        import matplotlib.pyplot as plt
 
-        for k_factor in heuristic_weights:
-            self.open = []
-            self.closed = set()
-            self.open_set = set()
-          # Reset the environment if a method exists
-            self.calculate_all_cost_and_heuristics_from_end_to_robot(movement, k_factor)
-            path = self.find_path(movement)
-            all_paths.append(path)
+        # The sweep runs in process unless a pool is asked for
+        if candidates is None:
+            candidates = self.sweep_k_factors(num_paths=num_paths, movement=movement, max_workers=max_workers)
 
         plt.figure(figsize=(10, 10))
-        max_k = max(cell.k for row in self.environment.grid for cell in row if cell.k is not None)
+        # Shade the cells explored by the last calculate_* search, if there was one
+        costs = self.context.cost_array() if self.context is not None else np.full((self.environment.grid_h, self.environment.grid_w), np.nan)
+        max_k = np.nanmax(costs) if not np.isnan(costs).all() else 1.0
 
         for y in range(self.environment.grid_h):
             for x in range(self.environment.grid_w):
                 cell = self.environment.grid[y][x]
+                k = costs[y, x]
                 if cell.obstacle:
                     plt.plot(x, y, 'ks')  # obstacle in black
-                elif cell.k is not None:
-                    alpha = min(cell.k / max_k, 1.0)  # ensure alpha is within [0, 1]
+                elif not np.isnan(k):
+                    alpha = min(k / max_k, 1.0)  # ensure alpha is within [0, 1]
                     plt.plot(x, y, 'co', alpha=alpha)  # explored node
 
         colors = ['b', 'g', 'r', 'c', 'm']
-        for i, path in enumerate(all_paths):
-            if path:  # Check if the path is not empty
-                path_x, path_y = zip(*path)
-                plt.plot(path_x, path_y, colors[i % len(colors)], label=f'Path {i+1}')
+        for i, candidate in enumerate(candidates):
+            k_factors = ', '.join(f'{k_factor:.2f}' for k_factor in candidate.k_factors)
+            plt.plot(candidate.path[:, 0], candidate.path[:, 1], colors[i % len(colors)], label=f'Path {i+1} (k_factor {k_factors})')
 
         plt.plot(self.environment.robot_x, self.environment.robot_y, 'ro')  # robot start in red
         plt.plot(self.environment.end_x, self.environment.end_y, 'go')  # goal in green
         plt.gca().invert_yaxis()
         plt.legend()
-        plt.show()
\ No newline at end of file
+        plt.show()
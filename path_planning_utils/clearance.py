@@ -0,0 +1,126 @@
+import math
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.priority_queue import PriorityQueue
+
+
+class ClearanceField:
+    """
+    Distance from every cell to its nearest obstacle cell.
+
+    It is built once per map with an exact Euclidean distance transform, O(H * W).
+    After that it is updated incrementally with the dynamic brushfire of Lau et al.,
+    "Efficient grid-based spatial representations for robot navigation in dynamic
+    environments". Cells of removed obstacles send a raise wave that clears the cells
+    they were nearest to. New and surviving obstacles send lower waves that refill
+    them. Only cells whose nearest obstacle changes are visited.
+
+    Incremental updates follow the 8-neighbourhood, so in rare cases a cell is left
+    slightly above its exact distance, as described in the paper.
+    """
+    __slots__ = ['grid_h', 'grid_w', 'distance', 'nearest', 'to_raise', 'open']
+
+    def __init__(self, obstacle_mask):
+        """
+        Builds the field with a Euclidean distance transform.
+
+        Args:
+            obstacle_mask (np.ndarray): (grid_h, grid_w) bool array, True on obstacle cells.
+        """
+        from scipy import ndimage
+
+        obstacle_mask = np.asarray(obstacle_mask, dtype=bool)
+        self.grid_h, self.grid_w = obstacle_mask.shape
+        size = self.grid_h * self.grid_w
+        if obstacle_mask.any():
+            distance, (nearest_y, nearest_x) = ndimage.distance_transform_edt(~obstacle_mask, return_indices=True)
+            self.distance = distance.ravel().tolist()
+            self.nearest = (nearest_y * self.grid_w + nearest_x).ravel().tolist()
+        else:
+            self.distance = [math.inf] * size
+            self.nearest = [-1] * size
+        self.to_raise = bytearray(size)
+        self.open = PriorityQueue()
+
+    def is_obstacle(self, index):
+        return index >= 0 and self.nearest[index] == index
+
+    def set_obstacle(self, index):
+        self.distance[index] = 0.0
+        self.nearest[index] = index
+        self.open.push(index, 0.0)
+
+    def remove_obstacle(self, index):
+        self.distance[index] = math.inf
+        self.nearest[index] = -1
+        self.to_raise[index] = 1
+        self.open.push(index, 0.0)
+
+    def get_neighbours(self, index):
+        x, y = index % self.grid_w, index // self.grid_w
+        return [(y + dy) * self.grid_w + x + dx for dy in (-1, 0, 1) for dx in (-1, 0, 1)
+                if (dx or dy) and 0 <= x + dx < self.grid_w and 0 <= y + dy < self.grid_h]
+
+    def get_cell_distance(self, index, obstacle):
+        grid_w = self.grid_w
+        return math.hypot(index % grid_w - obstacle % grid_w, index // grid_w - obstacle // grid_w)
+
+    def update_cells(self, obstacle_cells, free_cells):
+        """
+        Adds and removes obstacle cells and propagates the change.
+
+        Args:
+            obstacle_cells (iterable): Flat indices that became obstacles.
+            free_cells (iterable): Flat indices that stopped being obstacles.
+
+        Returns:
+            set: Flat indices whose distance changed.
+        """
+        for index in free_cells:
+            if self.is_obstacle(index):
+                self.remove_obstacle(index)
+        for index in obstacle_cells:
+            if not self.is_obstacle(index):
+                self.set_obstacle(index)
+
+        distance, nearest, to_raise = self.distance, self.nearest, self.to_raise
+        changed = set()
+        while self.open:
+            _, index = self.open.pop()
+            changed.add(index)
+            if to_raise[index]:
+                # Raise: requeue the neighbours and clear those whose nearest obstacle is gone,
+                # so the surviving obstacles can refill the cleared cells
+                for neighbour in self.get_neighbours(index):
+                    if nearest[neighbour] != -1 and not to_raise[neighbour]:
+                        self.open.push(neighbour, distance[neighbour])
+                        if not self.is_obstacle(nearest[neighbour]):
+                            distance[neighbour] = math.inf
+                            nearest[neighbour] = -1
+                            to_raise[neighbour] = 1
+                to_raise[index] = 0
+            elif self.is_obstacle(nearest[index]):
+                # Lower: offer this cell's obstacle to the neighbours
+                obstacle = nearest[index]
+                for neighbour in self.get_neighbours(index):
+                    if not to_raise[neighbour]:
+                        cell_distance = self.get_cell_distance(neighbour, obstacle)
+                        if cell_distance < distance[neighbour]:
+                            distance[neighbour] = cell_distance
+                            nearest[neighbour] = obstacle
+                            self.open.push(neighbour, cell_distance)
+        return changed
+
+    def to_array(self, max_distance=None):
+        """
+        Returns the field as a (grid_h, grid_w) array.
+
+        Args:
+            max_distance (float, optional): Cap for cells with no obstacle at all (inf otherwise). Defaults to None.
+
+        Returns:
+            np.ndarray: Distance to the nearest obstacle of every cell.
+        """
+        distance = np.array(self.distance, dtype=np.float64).reshape(self.grid_h, self.grid_w)
+        if max_distance is not None:
+            np.minimum(distance, max_distance, out=distance)
+        return distance
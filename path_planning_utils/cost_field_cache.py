@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+
+class CostFieldCache:
+    """
+    Least-recently-used cache of complete cost-to-go fields (frozen SearchContext
+    objects), bounded by the memory they hold.
+
+    Keys combine the goal, the search settings and StaticMap.fingerprint(), so a
+    changed map never hits a stale field.
+    """
+    __slots__ = ['max_bytes', 'nbytes', 'entries', 'lock', 'hits', 'misses']
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_bytes (int, optional): Memory budget for the cached fields. Defaults to 64 MiB.
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the cached field for a key and marks it as most recently used.
+
+        Args:
+            key (tuple): Cache key.
+
+        Returns:
+            SearchContext: The cached field, or None on a miss.
+        """
+        with self.lock:
+            context = self.entries.get(key)
+            if context is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return context
+
+    def put(self, key, context):
+        """
+        Stores a field, evicting the least recently used ones until it fits the budget.
+        A field larger than the whole budget is not stored.
+
+        Args:
+            key (tuple): Cache key.
+            context (SearchContext): Frozen search context holding the field.
+        """
+        size = context.nbytes
+        with self.lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key).nbytes
+            if size > self.max_bytes:
+                return
+            while self.entries and self.nbytes + size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+            self.entries[key] = context
+            self.nbytes += size
+
+    def clear(self):
+        """
+        Removes every cached field.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
@@ -0,0 +1,212 @@
+import math
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.bstar import PathPlanner
+from singaboat_vrx.custom_plan1.path_planning_utils.priority_queue import PriorityQueue
+
+# Slack on the termination test of compute_shortest_path. Sums of 1 and sqrt(2) steps
+# taken in different orders round differently, so a key that ties the robot's key may
+# compare a few ulps above it and must still be expanded
+KEY_TOLERANCE = 1e-9
+
+
+class IncrementalPathPlanner(PathPlanner):
+    """
+    D* Lite replanner built on the reverse (end to robot) search of PathPlanner.
+
+    It keeps the cost-to-go field g and its one-step lookahead rhs from the end
+    between calls. When cells become blocked or free, only the vertices whose
+    cost actually changes are re-expanded. Replanning cost therefore scales with
+    the size of the change, not with the size of the map.
+
+    Blocked cells (obstacles and repulsion) are impassable, as in the
+    calculate_non_obstacle_* searches. Steps cost their Euclidean length.
+    """
+
+    def __init__(self, environment, obstacle_penalty: int, repulsion_penalty: int, movement='queen'):
+        super().__init__(environment, obstacle_penalty, repulsion_penalty)
+        self.movement = movement
+        self.free = []
+        self.g = []
+        self.rhs = []
+        self.queue = PriorityQueue()
+        self.km = 0.0
+        self.start = None
+        self.last_start = None
+        self.goal = None
+        self.expanded = 0
+
+    def heuristic(self, index):
+        grid_w = self.environment.grid_w
+        return math.hypot(index % grid_w - self.start % grid_w, index // grid_w - self.start // grid_w)
+
+    def calculate_key(self, index):
+        g_rhs = min(self.g[index], self.rhs[index])
+        return (g_rhs + self.heuristic(index) + self.km, g_rhs)
+
+    def neighbours(self, index):
+        # (neighbour, step_cost) pairs of a flat index
+        grid_w = self.environment.grid_w
+        x, y = index % grid_w, index // grid_w
+        interior = self.get_interior_mask(1)[index]
+        return [(index + delta, step_cost) for dx, dy, step_cost, delta in self.get_neighbour_table(self.movement, 1) if interior or self.is_inside_grid(x + dx, y + dy)]
+
+    def lookahead(self, index):
+        # rhs: cheapest step into a free neighbour plus that neighbour's g
+        if not self.free[index]:
+            return math.inf
+        g, free = self.g, self.free
+        return min((step_cost + g[neighbour] for neighbour, step_cost in self.neighbours(index) if free[neighbour]), default=math.inf)
+
+    def update_vertex(self, index):
+        if index != self.goal:
+            self.rhs[index] = self.lookahead(index)
+        if self.g[index] != self.rhs[index]:
+            self.queue.push(index, self.calculate_key(index))
+        elif index in self.queue:
+            self.queue.remove(index)
+
+    def initialize(self):
+        """
+        Starts a new search from the end of the environment to the robot.
+        """
+        grid_w = self.environment.grid_w
+        static_map = self.get_static_map()
+        self.free = list(static_map.free)
+        self.g = [math.inf] * len(self.free)
+        self.rhs = [math.inf] * len(self.free)
+        self.queue = PriorityQueue()
+        self.km = 0.0
+        self.expanded = 0
+        self.goal = self.environment.end_y * grid_w + self.environment.end_x
+        self.start = self.last_start = self.environment.robot_y * grid_w + self.environment.robot_x
+        # The robot and end cells are never treated as blocked
+        self.free[self.goal] = self.free[self.start] = True
+        self.rhs[self.goal] = 0.0
+        self.queue.push(self.goal, self.calculate_key(self.goal))
+
+    def compute_shortest_path(self):
+        """
+        Expands inconsistent vertices until the robot's cost is final.
+
+        Returns:
+            int: Number of vertices expanded by this call.
+        """
+        g, rhs, queue, start = self.g, self.rhs, self.queue, self.start
+        expanded = 0
+        while queue and (queue.peek()[0][0] <= self.calculate_key(start)[0] + KEY_TOLERANCE or rhs[start] != g[start]):
+            old_key, index = queue.peek()
+            new_key = self.calculate_key(index)
+            expanded += 1
+            if old_key < new_key:
+                queue.push(index, new_key)
+            elif g[index] > rhs[index]:
+                g[index] = rhs[index]
+                queue.remove(index)
+                for neighbour, _ in self.neighbours(index):
+                    self.update_vertex(neighbour)
+            else:
+                g[index] = math.inf
+                self.update_vertex(index)
+                for neighbour, _ in self.neighbours(index):
+                    self.update_vertex(neighbour)
+        self.expanded += expanded
+        return expanded
+
+    def plan_from_end_to_robot(self):
+        """
+        Runs the initial search.
+
+        Returns:
+            tuple: (path, orientation) arrays as returned by raw_path_finder_from_robot_to_end.
+        """
+        self.initialize()
+        self.compute_shortest_path()
+        return self.find_path()
+
+    def move_robot(self, x, y):
+        """
+        Moves the start of the search to the robot's new cell.
+
+        The robot's cell is never treated as blocked. The cell it leaves takes back its
+        state from the static map, so a robot that started on an obstacle does not leave
+        a free cell behind.
+
+        Args:
+            x (int): X coordinate of the robot.
+            y (int): Y coordinate of the robot.
+        """
+        old_start, self.start = self.start, y * self.environment.grid_w + x
+        if self.start == old_start:
+            return
+        old_free = old_start == self.goal or bool(self.get_static_map().free[old_start])
+        self.update_free({old_start: old_free, self.start: True})
+
+    def update_free(self, flags):
+        """
+        Sets the blocked state of cells and repairs the cost field around the ones that changed.
+
+        Args:
+            flags (dict): Flat index -> True if the cell is free to move.
+        """
+        self.km += self.heuristic(self.last_start)
+        self.last_start = self.start
+        affected = set()
+        for index, free in flags.items():
+            if free == self.free[index]:
+                continue
+            self.free[index] = free
+            affected.add(index)
+            affected.update(neighbour for neighbour, _ in self.neighbours(index))
+        for index in affected:
+            self.update_vertex(index)
+        self.compute_shortest_path()
+
+    def update_cells(self, changed_cells):
+        """
+        Repairs the cost field after cells of the environment became blocked or free.
+
+        Args:
+            changed_cells (iterable): (x, y) of every cell whose obstacle or repulsion state changed.
+
+        Returns:
+            tuple: (path, orientation) arrays from the robot's current cell to the end.
+        """
+        changed_cells = list(changed_cells)
+        self.environment.update_traversal_cost_on_grid(changed_cells)
+        grid_w = self.environment.grid_w
+        flags = {}
+        for x, y in changed_cells:
+            if self.is_inside_grid(x, y):
+                index = y * grid_w + x
+                flags[index] = index in (self.start, self.goal) or self.is_free_to_move(x, y)
+        self.update_free(flags)
+        return self.find_path()
+
+    def find_path(self):
+        """
+        Follows the cheapest step plus cost-to-go from the robot to the end.
+
+        Returns:
+            tuple: (path, orientation) arrays, both empty if the end is unreachable.
+        """
+        grid_w = self.environment.grid_w
+        g, free = self.g, self.free
+        current = self.start
+        path = [current]
+        visited = {current}
+        while current != self.goal:
+            best, best_cost = -1, math.inf
+            for neighbour, step_cost in self.neighbours(current):
+                if free[neighbour] and neighbour not in visited and step_cost + g[neighbour] < best_cost:
+                    best, best_cost = neighbour, step_cost + g[neighbour]
+            if best < 0:
+                return np.empty((0, 2), dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+            current = best
+            path.append(current)
+            visited.add(current)
+        indices = np.array(path, dtype=np.int64)
+        path = np.stack((indices % grid_w, indices // grid_w), axis=1)
+        return path, np.diff(path, axis=0)
+
+    def cost_to_go(self, x, y):
+        return self.g[y * self.environment.grid_w + x]
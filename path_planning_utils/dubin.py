@@ -1,7 +1,5 @@
-import matplotlib.pyplot as plt
 import math
 import numpy as np
-from scipy.spatial.transform import Rotation
 
 
 def rot_mat_2d(angle):
@@ -22,6 +20,8 @@ def rot_mat_2d(angle):
 
 
     """
+    from scipy.spatial.transform import Rotation
+
     return Rotation.from_euler('z', angle).as_matrix()[0:2, 0:2]
 
 
@@ -377,6 +377,8 @@ def plot_arrow(x, y, yaw, arrow_length=1.0,
             plot_arrow(i_x, i_y, i_yaw, head_width=head_width,
                        fc=fc, ec=ec, **kwargs)
     else:
+        import matplotlib.pyplot as plt
+
         plt.arrow(x, y,
                   arrow_length * math.cos(yaw),
                   arrow_length * math.sin(yaw),
@@ -401,6 +403,8 @@ def main():
     path_x, path_y, path_yaw, mode, lengths = plan_dubins_path(start_x, start_y, start_yaw, end_x, end_y, end_yaw, curvature)
 
     if show_animation:
+        import matplotlib.pyplot as plt
+
         plt.plot(path_x, path_y, label="".join(mode))
         plot_arrow(start_x, start_y, start_yaw)
         plot_arrow(end_x, end_y, end_yaw)
@@ -1,11 +1,14 @@
 from singaboat_vrx.custom_plan1.path_planning_utils import node
+from singaboat_vrx.custom_plan1.path_planning_utils.clearance import ClearanceField
+from singaboat_vrx.custom_plan1.path_planning_utils.grid_arrays import GridArrays
+from singaboat_vrx.custom_plan1.path_planning_utils.trajectory_store import ObstaclePaths, TrajectoryStore
 import math
-import matplotlib.pyplot as plt
+import numpy as np
 
 class Environment:
-    __slots__ = ['grid_h', 'grid_w', 'display', 'repulsion_offset', 'all_repulsions', 'current_obstacles_position', 'obstacles_path', 'collisions', 'grid', 'robot_x', 'robot_y', 'robot_dx', 'robot_dy', 'global_path', 'global_orientation', 'end_x', 'end_y', 'robot_path', 'robot_orientation']
+    __slots__ = ['grid_h', 'grid_w', 'display', 'repulsion_offset', 'repulsion_mask', 'current_obstacles_position', 'static_obstacle_mask', 'trajectories', 'collisions', 'grid', 'robot_x', 'robot_y', 'robot_dx', 'robot_dy', 'global_path', 'global_orientation', 'end_x', 'end_y', 'robot_path', 'robot_orientation', 'grid_backend', 'repulsion_source_mask', 'repulsion_source_factor', 'offset_repulsion_mask', 'robot_distance', 'end_distance', 'robot_distance_origin', 'end_distance_origin', 'clearance', 'traversal_cost', 'version']
 
-    def __init__(self, grid_h, grid_w, display=[], repulsion_offset=10):
+    def __init__(self, grid_h, grid_w, display=[], repulsion_offset=10, grid_backend='node'):
         """
         Initializes the environment.
 
@@ -14,17 +17,51 @@ class Environment:
             grid_w (int): Width of the grid.
             display (list, optional): Display settings. Defaults to [].
             repulsion_offset (int, optional): Offset for repulsion. Defaults to 5.
+            grid_backend (str, optional): 'node' for one node.Node per cell, 'array' for
+                GridArrays storage. Defaults to 'node'.
         """
         self.grid_h = grid_h
         self.grid_w = grid_w
         self.display = display
         self.repulsion_offset = repulsion_offset
-        self.all_repulsions = {"x_repulsions": [], "y_repulsions": [], "repulsion_factor": []}
+        self.grid_backend = grid_backend
+        # Cells that hold repulsion, read through all_repulsions
+        self.repulsion_mask = np.zeros((grid_h, grid_w), dtype=bool)
+        # Repulsion cells and factors given to put_repulsion_mask_in_memory, and the offset
+        # cells placed around them, so the offsets can follow a moved start or end
+        self.repulsion_source_mask = np.zeros((grid_h, grid_w), dtype=bool)
+        self.repulsion_source_factor = np.zeros((grid_h, grid_w), dtype=np.float32)
+        self.offset_repulsion_mask = np.zeros((grid_h, grid_w), dtype=bool)
 
         self.current_obstacles_position = {}
-        self.obstacles_path = {}       
+        # Static obstacles ingested in bulk by put_static_obstacle_mask, without ids or trajectories
+        self.static_obstacle_mask = np.zeros((grid_h, grid_w), dtype=bool)
+        # Origin and velocity of every obstacle, the predicted cells are computed on demand
+        self.trajectories = TrajectoryStore(int(math.sqrt(math.pow(self.grid_w, 2) + math.pow(self.grid_h, 2))))
         self.collisions = {}
+        self.robot_path = []
+        self.robot_orientation = []
         self.grid = self.create_grid()
+        # Distance of every cell to the robot and to the end, shared with the array grid,
+        # and the positions they were last computed for
+        if isinstance(self.grid, GridArrays):
+            self.robot_distance, self.end_distance = self.grid.robot_distance, self.grid.end_distance
+        else:
+            self.robot_distance = np.zeros((grid_h, grid_w), dtype=np.float64)
+            self.end_distance = np.zeros((grid_h, grid_w), dtype=np.float64)
+        self.robot_distance_origin = None
+        self.end_distance_origin = None
+        # Cost layer read by the planners: inf on obstacles, the repulsion factor (offset
+        # inflation included) on repulsion cells, 0 on free cells. Shared with the array grid.
+        if isinstance(self.grid, GridArrays):
+            self.traversal_cost = self.grid.traversal_cost
+        else:
+            self.traversal_cost = np.zeros((grid_h, grid_w), dtype=np.float32)
+        # Distance of every cell to its nearest obstacle, built by put_clearance_on_grid
+        self.clearance = None
+        # Bumped by every change to the layers the planners read (traversal cost, distance
+        # fields, clearance), so they know when their cached snapshot is stale
+        self.version = 0
         self.global_path = []
         self.global_orientation= []
     def is_inside_grid(self, x, y):
@@ -64,6 +101,8 @@ class Environment:
             repulsion_y (list): Y coordinates of the repulsion points.
             plot_text (str): Title for the plot.
         """
+        import matplotlib.pyplot as plt
+
         plt.figure(figsize=(10, 10))
         plt.scatter(repulsion_x, repulsion_y, color='blue', label='Original Points')
         plt.title('Repulsion Points and Their Offsets')
@@ -93,6 +132,40 @@ class Environment:
         self.end_x, self.end_y = end_x, end_y
         self.__put_global_path_in_memory()
 
+    def move_robot_and_end(self, robot_x, robot_y, robot_dx, robot_dy, end_x, end_y):
+        """
+        Moves the robot and the end of a prepared environment in place, without rebuilding it.
+
+        Robot and end cells placed by put_robot_on_grid and put_end_on_grid move with them,
+        distance fields computed before are refreshed for the new positions, and offset
+        repulsion cells are recomputed for the new exclusion disks around the start and end.
+
+        Args:
+            robot_x (int): X coordinate of the robot.
+            robot_y (int): Y coordinate of the robot.
+            robot_dx (float): X direction of the robot.
+            robot_dy (float): Y direction of the robot.
+            end_x (int): X coordinate of the end point.
+            end_y (int): Y coordinate of the end point.
+        """
+        robot_on_grid = self.is_inside_grid(self.robot_x, self.robot_y) and self.grid[self.robot_y][self.robot_x].robot
+        end_on_grid = self.is_inside_grid(self.end_x, self.end_y) and self.grid[self.end_y][self.end_x].end
+        if robot_on_grid:
+            self.grid[self.robot_y][self.robot_x].robot = False
+            self.grid[self.robot_y][self.robot_x].robot_movement = [0, 0]
+        if end_on_grid:
+            self.grid[self.end_y][self.end_x].end = False
+        self.put_robot_and_end_in_memory(robot_x, robot_y, robot_dx, robot_dy, end_x, end_y)
+        if robot_on_grid:
+            self.put_robot_on_grid()
+        elif self.robot_distance_origin is not None:
+            self.put_distance_of_each_nodes_to_robot_on_grid()
+        if end_on_grid:
+            self.put_end_on_grid()
+        elif self.end_distance_origin is not None:
+            self.put_distance_of_each_nodes_to_end_on_grid()
+        self.update_offset_repulsion_on_grid()
+
     def bresenham(self, x1, y1, x2, y2):
         """
         Bresenham's line algorithm to determine the points on a line between two points.
@@ -147,21 +220,12 @@ class Environment:
             obstacle_dx (int): X direction of the obstacle.
             obstacle_dy (int): Y direction of the obstacle.
         """
-        # Calculate diagonal length for obstacle movement path
-        diagonal = int(math.sqrt(math.pow(self.grid_w, 2) + math.pow(self.grid_h, 2)))
-        
-        # Compute the obstacle's movement path
-        obstacle_movement = [[obstacle_x + i * obstacle_dx, obstacle_y + i * obstacle_dy] for i in range(diagonal)]
-        
-        # Compute the obstacle's orientation at each step of its path
-        obstacle_orientation = [[obstacle_dx, obstacle_dy] for _ in range(diagonal)]
-        
-        # Assign a unique ID for the obstacle
-        obstacle_id = max(list(self.current_obstacles_position.keys()), default=-1) + 1
+        # Store the obstacle's origin and velocity, its movement path over the grid diagonal
+        # is computed on demand through obstacles_path. The store assigns the next unique ID.
+        obstacle_id = self.trajectories.add(obstacle_x, obstacle_y, obstacle_dx, obstacle_dy)
         
         # Store the obstacle's initial position and movement parameters
         self.current_obstacles_position[obstacle_id] = [obstacle_x, obstacle_y, obstacle_dx, obstacle_dy]
-        self.obstacles_path[obstacle_id] = {'movement': obstacle_movement, 'orientation': obstacle_orientation}
         
         # Call the method to actually put the obstacle in the environment
         self.put_obstacle(obstacle_x, obstacle_y, obstacle_dx, obstacle_dy)
@@ -180,6 +244,148 @@ class Environment:
         for obstacle_x, obstacle_y, obstacle_dx, obstacle_dy in zip(obstacles_x, obstacles_y, obstacles_dx, obstacles_dy):
             self.put_obstacle_in_memory(obstacle_x, obstacle_y, obstacle_dx, obstacle_dy)
 
+    def put_static_obstacle_mask(self, mask):
+        """
+        Places a static obstacle (dx = dy = 0) on every cell of an occupancy mask in one step.
+
+        No id or trajectory is stored per cell, since a static obstacle's prediction is the
+        mask itself. The cells block the planners like any other obstacle but are not listed
+        in current_obstacles_position or obstacles_path, and find_collisions does not report
+        them. Use put_obstacles_in_memory for moving obstacles.
+
+        Args:
+            mask (np.ndarray): (grid_h, grid_w) bool array, True on obstacle cells. May be a
+                read-only or memory-mapped array, it is not modified.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        if mask.shape != (self.grid_h, self.grid_w):
+            raise ValueError(f"mask must have shape {(self.grid_h, self.grid_w)}, got {mask.shape}")
+        self.static_obstacle_mask |= mask
+        if isinstance(self.grid, GridArrays):
+            self.grid.obstacle |= mask
+            self.grid.obstacle_movement[mask] = 0
+            self.grid.put_traversal_costs(mask)
+            self.update_clearance_on_mask(mask)
+            self.version += 1
+            return
+        obstacles_y, obstacles_x = np.nonzero(mask)
+        for obstacle_x, obstacle_y in zip(obstacles_x.tolist(), obstacles_y.tolist()):
+            self.grid[obstacle_y][obstacle_x].obstacle = True
+            self.grid[obstacle_y][obstacle_x].obstacle_movement = [0, 0]
+        self.update_traversal_cost_on_grid(zip(obstacles_x.tolist(), obstacles_y.tolist()))
+
+    def remove_static_obstacle_mask(self, mask):
+        """
+        Clears the static obstacles placed by put_static_obstacle_mask on every cell of a mask.
+        Cells holding an obstacle of put_obstacles_in_memory are left alone.
+
+        Args:
+            mask (np.ndarray): (grid_h, grid_w) bool array, True on the cells to clear.
+        """
+        mask = np.asarray(mask, dtype=bool) & self.static_obstacle_mask
+        self.static_obstacle_mask &= ~mask
+        if isinstance(self.grid, GridArrays):
+            self.grid.obstacle[mask] = False
+            self.grid.put_traversal_costs(mask)
+            self.update_clearance_on_mask(mask)
+            self.version += 1
+            return
+        obstacles_y, obstacles_x = np.nonzero(mask)
+        for obstacle_x, obstacle_y in zip(obstacles_x.tolist(), obstacles_y.tolist()):
+            self.grid[obstacle_y][obstacle_x].obstacle = False
+        self.update_traversal_cost_on_grid(zip(obstacles_x.tolist(), obstacles_y.tolist()))
+
+    @property
+    def obstacles_path(self):
+        """
+        Mapping: obstacle id -> {'movement': [[x, y], ...], 'orientation': [[dx, dy], ...]} over the
+            grid diagonal, computed lazily from the trajectory store.
+        """
+        return ObstaclePaths(self.trajectories)
+
+    def get_obstacle_trajectories(self):
+        """
+        Returns every obstacle as arrays, for vectorized trajectory queries.
+
+        Returns:
+            tuple: (ids, origins, velocities) where ids has shape (n,), origins holds the
+                [x, y] at timestep 0 and velocities the [dx, dy] per timestep, both (n, 2).
+        """
+        return self.trajectories.get_arrays()
+
+    def get_obstacles_at(self, x, y, timestep):
+        """
+        Returns the ids of the obstacles predicted to occupy a cell at a timestep.
+
+        Args:
+            x (int): X coordinate of the cell.
+            y (int): Y coordinate of the cell.
+            timestep (int): Timestep of the query.
+
+        Returns:
+            np.ndarray: Obstacle ids.
+        """
+        return self.trajectories.occupants(x, y, timestep)
+
+    def find_collisions(self, path):
+        """
+        Compares a robot path with every predicted obstacle trajectory in one broadcast over all timesteps.
+
+        Args:
+            path (array-like): (n, 2) array of the robot's [x, y] at timesteps 0 .. n - 1.
+
+        Returns:
+            tuple: (timesteps, obstacle_ids, swaps) arrays with one entry per conflict, sorted by timestep.
+                swaps is False when the robot and the obstacle share a cell at the timestep, and True
+                when they swap cells or cross diagonals between the timestep and the next one.
+        """
+        path = np.asarray(path, dtype=np.int64).reshape(-1, 2)
+        ids, origins, velocities = self.get_obstacle_trajectories()
+        # Obstacle paths are predicted as far as the grid diagonal
+        horizon = min(len(path), self.trajectories.horizon)
+        if horizon == 0 or len(ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+        # One key per [x, y] (x + y * 2 ** shift) is linear in the position, so the obstacle keys
+        # of all timesteps are a single multiply-add. int32 keys are much faster and hold sums of
+        # two positions while every coordinate stays below 2 ** 13.
+        path = path[:horizon]
+        reach = max(np.abs(path).max(), np.abs(origins).max() + horizon * np.abs(velocities).max())
+        dtype, shift = (np.int32, 16) if reach < 2 ** 13 else (np.int64, 32)
+        path, origins, velocities = path.astype(dtype), origins.astype(dtype), velocities.astype(dtype)
+        path_keys = path[:, 0] + (path[:, 1] << shift)
+        origin_keys = origins[:, 0] + (origins[:, 1] << shift)
+        velocity_keys = velocities[:, 0] + (velocities[:, 1] << shift)
+        steps = np.arange(horizon, dtype=dtype)[:, None]
+        same = origin_keys + steps * velocity_keys == path_keys[:, None]
+        # Equal midpoints of the moves from t to t + 1 mean swapped cells or crossed diagonals
+        crossing = 2 * origin_keys + (2 * steps[:-1] + 1) * velocity_keys == (path_keys[:-1] + path_keys[1:])[:, None]
+        crossing &= ~same[:-1] & ~same[1:]
+        same_timesteps, same_obstacles = np.divmod(np.flatnonzero(same), len(ids))
+        crossing_timesteps, crossing_obstacles = np.divmod(np.flatnonzero(crossing), len(ids))
+        timesteps = np.concatenate((same_timesteps, crossing_timesteps))
+        obstacle_ids = ids[np.concatenate((same_obstacles, crossing_obstacles))]
+        swaps = np.concatenate((np.zeros(len(same_timesteps), dtype=bool), np.ones(len(crossing_timesteps), dtype=bool)))
+        order = np.argsort(timesteps, kind='stable')
+        return timesteps[order], obstacle_ids[order], swaps[order]
+
+    def put_collision_points_in_memory(self, path=None):
+        """
+        Stores the obstacles the robot path runs into, per timestep, in collisions.
+
+        Args:
+            path (array-like, optional): Robot path, one cell per timestep. Defaults to robot_path.
+
+        Returns:
+            dict: timestep -> list of obstacle ids.
+        """
+        if path is None:
+            path = self.robot_path
+        timesteps, obstacle_ids, _ = self.find_collisions(path)
+        self.collisions = {}
+        for timestep, obstacle_id in zip(timesteps.tolist(), obstacle_ids.tolist()):
+            self.collisions.setdefault(timestep, []).append(obstacle_id)
+        return self.collisions
+
     def plot_environment_in_memory(self, pause_time=1):
         """
         Plots the environment from memory, including the robot, end point, obstacles, and paths.
@@ -187,6 +393,8 @@ class Environment:
         Args:
             pause_time (int, optional): Pause time for the plot. Defaults to 1.
         """
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(1, 1, figsize=(12, 12))
         ax.add_patch(plt.Rectangle((self.robot_x, self.robot_y), 1, 1, color='green'))
         ax.annotate('', (self.robot_x + 0.5, self.robot_y + 0.5), (self.robot_x + 0.5 + self.robot_dx, self.robot_y + 0.5 + self.robot_dy), arrowprops={'color': 'purple', 'arrowstyle': '<-'})
@@ -226,20 +434,77 @@ class Environment:
 
     def create_grid(self):
         """
-        Creates a grid of nodes.
+        Creates a grid of nodes, or an array-backed grid when grid_backend is 'array'.
 
         Returns:
-            list: 2D list representing the grid.
+            list or GridArrays: 2D grid indexed as grid[y][x].
         """
+        if self.grid_backend == 'array':
+            return GridArrays(self.grid_h, self.grid_w, self.display)
         return [[node.Node(j, i, display=self.display) for j in range(self.grid_w)] for i in range(self.grid_h)]
 
+    def get_grid_arrays(self):
+        """
+        Returns the grid as arrays. For the array backend this is the grid itself,
+        for the node backend it is a snapshot taken from the nodes, one pass over every
+        node. Planners cache what they read from it until version changes.
+
+        Returns:
+            GridArrays: Array view of the grid.
+        """
+        if isinstance(self.grid, GridArrays):
+            return self.grid
+        return GridArrays.from_node_grid(self.grid, self.display)
+
+    def put_costs_on_grid(self, costs):
+        """
+        Stores search costs on the grid, NaN entries meaning "not computed".
+
+        Args:
+            costs (np.ndarray): Array of shape (grid_h, grid_w) with the cost of each node.
+        """
+        if isinstance(self.grid, GridArrays):
+            self.grid.k[...] = costs
+            return
+        for i, row in enumerate(costs.tolist()):
+            for j, k in enumerate(row):
+                self.grid[i][j].k = None if math.isnan(k) else k
+
+    def get_distance_field(self, x, y):
+        """
+        Calculates the Euclidean distance of every cell to a point in one broadcast.
+
+        Args:
+            x (int): X coordinate of the point.
+            y (int): Y coordinate of the point.
+
+        Returns:
+            np.ndarray: Array of shape (grid_h, grid_w) indexed as [y, x].
+        """
+        # sqrt of the exact integer sum of squares, bit-identical to euclidian_distance
+        return np.sqrt((np.arange(self.grid_w)[None, :] - x) ** 2 + (np.arange(self.grid_h)[:, None] - y) ** 2)
+
+    def put_distance_field_on_grid(self, distance, attribute):
+        """
+        Copies a distance array onto the nodes of a node-backed grid (the array grid shares it).
+        """
+        if isinstance(self.grid, GridArrays):
+            return
+        for row, values in zip(self.grid, distance.tolist()):
+            for cell, value in zip(row, values):
+                setattr(cell, attribute, value)
+
     def put_distance_of_each_nodes_to_robot_on_grid(self):
         """
-        Calculates and stores the distance of each node to the robot on the grid.
+        Calculates and stores the distance of each node to the robot on the grid,
+        unless the robot has not moved since the last call.
         """
-        for i in range(self.grid_h):
-            for j in range(self.grid_w):
-                self.grid[i][j].robot_distance = self.euclidian_distance(self.robot_x, self.robot_y, self.grid[i][j].x, self.grid[i][j].y)
+        if self.robot_distance_origin == (self.robot_x, self.robot_y):
+            return
+        self.robot_distance[...] = self.get_distance_field(self.robot_x, self.robot_y)
+        self.put_distance_field_on_grid(self.robot_distance, 'robot_distance')
+        self.robot_distance_origin = (self.robot_x, self.robot_y)
+        self.version += 1
 
     def put_robot_on_grid(self):
         """
@@ -252,11 +517,15 @@ class Environment:
 
     def put_distance_of_each_nodes_to_end_on_grid(self):
         """
-        Calculates and stores the distance of each node to the end point on the grid.
+        Calculates and stores the distance of each node to the end point on the grid,
+        unless the end point has not moved since the last call.
         """
-        for i in range(self.grid_h):
-            for j in range(self.grid_w):
-                self.grid[i][j].end_distance = self.euclidian_distance(self.end_x, self.end_y, self.grid[i][j].x, self.grid[i][j].y)
+        if self.end_distance_origin == (self.end_x, self.end_y):
+            return
+        self.end_distance[...] = self.get_distance_field(self.end_x, self.end_y)
+        self.put_distance_field_on_grid(self.end_distance, 'end_distance')
+        self.end_distance_origin = (self.end_x, self.end_y)
+        self.version += 1
 
     def put_end_on_grid(self):
         """
@@ -282,10 +551,23 @@ class Environment:
             if is_offset:
                 self.grid[repulsion_y][repulsion_x].repulsion_factor = repulsion_factor + 140
 
-            self.all_repulsions["x_repulsions"].append(repulsion_x)
-            self.all_repulsions["y_repulsions"].append(repulsion_y)
-            self.all_repulsions["repulsion_factor"].append(repulsion_factor)
-            
+            self.repulsion_mask[repulsion_y, repulsion_x] = True
+            self.update_traversal_cost_on_grid([(repulsion_x, repulsion_y)])
+
+    @property
+    def all_repulsions(self):
+        """
+        Unique repulsion points (original and offset), in row-major order.
+
+        Returns:
+            dict: Arrays of "x_repulsions", "y_repulsions" and their "repulsion_factor".
+        """
+        repulsion_y, repulsion_x = np.nonzero(self.repulsion_mask)
+        if isinstance(self.grid, GridArrays):
+            factor = self.grid.repulsion_factor[repulsion_y, repulsion_x]
+        else:
+            factor = np.array([self.grid[y][x].repulsion_factor for x, y in zip(repulsion_x.tolist(), repulsion_y.tolist())], dtype=np.float32)
+        return {"x_repulsions": repulsion_x, "y_repulsions": repulsion_y, "repulsion_factor": factor}
 
     def put_repulsions(self, repulsions_x, repulsions_y, repulsions_factor, is_offset=False):
         """
@@ -313,6 +595,7 @@ class Environment:
         if self.is_inside_grid(obstacle_x, obstacle_y):
             self.grid[obstacle_y][obstacle_x].obstacle = True
             self.grid[obstacle_y][obstacle_x].obstacle_movement = [obstacle_dx, obstacle_dy]
+            self.update_traversal_cost_on_grid([(obstacle_x, obstacle_y)])
 
     def remove_repulsion_on_grid(self, repulsion_x, repulsion_y, repulsion_factor):
         """
@@ -325,6 +608,7 @@ class Environment:
         """
         if self.is_inside_grid(repulsion_x, repulsion_y):
             self.grid[repulsion_y][repulsion_x].repulsion_factor -= repulsion_factor
+            self.update_traversal_cost_on_grid([(repulsion_x, repulsion_y)])
 
     def remove_repulsions_on_grid(self, repulsions_x, repulsions_y, repulsions_factor):
         """
@@ -340,75 +624,188 @@ class Environment:
 
     def put_repulsion_in_memory(self, REPULSION_X, REPULSION_Y, REPULSION_VALUES):
         """
-        Stores repulsion points in memory and plots the original and offset repulsion points.
+        Stores repulsion points in memory together with their offset repulsion points.
 
         Args:
             REPULSION_X (list): List of X coordinates for the repulsion points.
             REPULSION_Y (list): List of Y coordinates for the repulsion points.
             REPULSION_VALUES (list): List of repulsion factors.
         """
-        self.put_repulsions(REPULSION_X, REPULSION_Y, REPULSION_VALUES)
+        repulsion_x, repulsion_y = np.asarray(REPULSION_X, dtype=np.int64), np.asarray(REPULSION_Y, dtype=np.int64)
+        inside = (repulsion_x >= 0) & (repulsion_x < self.grid_w) & (repulsion_y >= 0) & (repulsion_y < self.grid_h)
+        factor = np.zeros((self.grid_h, self.grid_w), dtype=np.float32)
+        factor[repulsion_y[inside], repulsion_x[inside]] = np.asarray(REPULSION_VALUES, dtype=np.float32)[inside]
         # self.plot_repulsion(REPULSION_X, REPULSION_Y, "Original input Repulsion")
+        self.put_repulsion_mask_in_memory(self.get_points_mask(REPULSION_X, REPULSION_Y), factor)
 
-        offset_x, offset_y = self.get_offset_repulsion(REPULSION_X, REPULSION_Y)
+    def put_repulsion_mask_in_memory(self, mask, factor):
+        """
+        Stores the repulsion cells of a mask together with their offset repulsion cells.
 
-        for offset_repulsion_x, offset_repulsion_y in zip(offset_x, offset_y):
-            self.put_repulsion(offset_repulsion_x, offset_repulsion_y, is_offset=True)
-        
-        self.put_repulsions(offset_x, offset_y, REPULSION_VALUES, is_offset=True)
-        
-    def __is_near_start_end(self, x, y):
+        Repulsion cells get their factor. Offset cells get 140 on top of the largest
+        factor of the repulsion cells they are the offset of.
+
+        Args:
+            mask (np.ndarray): (grid_h, grid_w) bool array, True on repulsion cells.
+            factor (np.ndarray): (grid_h, grid_w) array of repulsion factors, read only under
+                the mask (e.g. the occupancy grid itself), or one factor for every cell. Neither
+                input is modified, so both may be read-only or memory-mapped.
+        """
+        from scipy import ndimage
+
+        mask = np.asarray(mask, dtype=bool)
+        factor = np.where(mask, factor, 0).astype(np.float32)
+        self.repulsion_source_mask |= mask
+        self.repulsion_source_factor[mask] = factor[mask]
+        offset = self.get_offset_repulsion_mask(mask)
+        self.offset_repulsion_mask |= offset
+        largest = ndimage.maximum_filter(factor, size=2 * self.repulsion_offset + 1, mode='constant')
+        factor[offset] = largest[offset] + 140
+        self.put_repulsion_mask_on_grid(mask | offset, factor)
+
+    def update_offset_repulsion_on_grid(self):
+        """
+        Recomputes the offset repulsion cells of every repulsion cell given to
+        put_repulsion_mask_in_memory, e.g. after the start or the end moved. Only cells
+        entering or leaving the offsets are written. Cells leaving them go back to their
+        own repulsion factor, or to none.
+        """
+        from scipy import ndimage
+
+        offset = self.get_offset_repulsion_mask(self.repulsion_source_mask)
+        left, entered = self.offset_repulsion_mask & ~offset, offset & ~self.offset_repulsion_mask
+        if not left.any() and not entered.any():
+            return
+        factor = self.repulsion_source_factor.copy()
+        if entered.any():
+            largest = ndimage.maximum_filter(factor, size=2 * self.repulsion_offset + 1, mode='constant')
+            factor[entered] = largest[entered] + 140
+        self.put_repulsion_mask_on_grid(left | entered, factor)
+        self.repulsion_mask &= ~(left & ~self.repulsion_source_mask)
+        self.offset_repulsion_mask = offset
+
+    def put_repulsion_mask_on_grid(self, mask, factor):
+        """
+        Places repulsion on every cell of a mask at once.
+
+        Args:
+            mask (np.ndarray): (grid_h, grid_w) bool array of the repulsion cells.
+            factor (np.ndarray): (grid_h, grid_w) array of repulsion factors.
+        """
+        if isinstance(self.grid, GridArrays):
+            self.grid.repulsion_factor[mask] = factor[mask]
+            self.grid.put_traversal_costs(mask)
+            self.version += 1
+        else:
+            repulsion_y, repulsion_x = np.nonzero(mask)
+            for x, y, value in zip(repulsion_x.tolist(), repulsion_y.tolist(), factor[mask].tolist()):
+                self.grid[y][x].repulsion_factor = value
+            self.update_traversal_cost_on_grid(zip(repulsion_x.tolist(), repulsion_y.tolist()))
+        self.repulsion_mask |= mask
+
+    def get_points_mask(self, points_x, points_y):
         """
-        Check if the given coordinate (x, y) is near either the robot's start position 
-        or the end position. A point is considered "near" if its Euclidean distance 
-        from either the start or end position is less than or equal to the threshold.
+        Returns:
+            np.ndarray: (grid_h, grid_w) bool array, True on the given points inside the grid.
+        """
+        points_x, points_y = np.asarray(points_x, dtype=np.int64), np.asarray(points_y, dtype=np.int64)
+        inside = (points_x >= 0) & (points_x < self.grid_w) & (points_y >= 0) & (points_y < self.grid_h)
+        mask = np.zeros((self.grid_h, self.grid_w), dtype=bool)
+        mask[points_y[inside], points_x[inside]] = True
+        return mask
 
-        :param x: X-coordinate of the point to check.
-        :param y: Y-coordinate of the point to check.
-        :return: True if the point is near the start or end position, False otherwise.
+    def get_window_count(self, mask, radius):
         """
-        # Calculate the Euclidean distance from the point (x, y) to the robot's start position
-        distance_to_start = math.sqrt((x - self.robot_x) ** 2 + (y - self.robot_y) ** 2)
+        Counts the True cells in the (2 * radius + 1) x (2 * radius + 1) window around
+        every cell, i.e. convolves the mask with a box, as two separable running sums.
+        This is O(H * W) whatever the radius.
 
-        # Calculate the Euclidean distance from the point (x, y) to the end position
-        distance_to_end = math.sqrt((x - self.end_x) ** 2 + (y - self.end_y) ** 2)
-        
-        # Check if the point is near the start or end position by comparing the distances to the threshold
-        return distance_to_start <= 20 or distance_to_end <= 20
+        Returns:
+            np.ndarray: (grid_h, grid_w) int32 array of counts.
+        """
+        size = 2 * radius + 1
+        counts = np.pad(mask.astype(np.int32), radius)
+        for axis in (0, 1):
+            running = np.cumsum(np.moveaxis(counts, axis, 0), axis=0)
+            window = running[size - 1:].copy()
+            window[1:] -= running[:-size]
+            counts = np.moveaxis(window, 0, axis)
+        return counts
+
+    def get_start_end_mask(self, radius=20):
+        """
+        Stamps a precomputed disk around the robot's start position and around the end position.
+
+        Args:
+            radius (int, optional): Radius of the disks. Defaults to 20.
 
-    
-    
-    def get_offset_repulsion(self, repulsion_x: list, repulsion_y: list) -> (list, list):
+        Returns:
+            np.ndarray: (grid_h, grid_w) bool array, True within radius of the start or the end.
         """
-        Calculates the offset repulsion points around the given repulsion points.
+        offsets = np.arange(-radius, radius + 1)
+        disk = offsets[:, None] ** 2 + offsets[None, :] ** 2 <= radius ** 2
+        mask = np.zeros((self.grid_h, self.grid_w), dtype=bool)
+        for x, y in ((self.robot_x, self.robot_y), (self.end_x, self.end_y)):
+            x0, y0 = max(x - radius, 0), max(y - radius, 0)
+            x1, y1 = min(x + radius + 1, self.grid_w), min(y + radius + 1, self.grid_h)
+            if x0 < x1 and y0 < y1:
+                mask[y0:y1, x0:x1] |= disk[y0 - y + radius:y1 - y + radius, x0 - x + radius:x1 - x + radius]
+        return mask
+
+    def get_offset_repulsion_mask(self, mask):
+        """
+        Calculates the offset repulsion cells of a repulsion mask: the cells within
+        repulsion_offset in x and in y of another repulsion cell. The box dilation of the
+        mask is computed with get_window_count. Cells within 20 of the robot's start or of
+        the end are left out.
+
+        Args:
+            mask (np.ndarray): (grid_h, grid_w) bool array, True on repulsion cells.
+
+        Returns:
+            np.ndarray: (grid_h, grid_w) bool array, True on offset repulsion cells.
+        """
+        return (self.get_window_count(mask, self.repulsion_offset) > mask) & ~self.get_start_end_mask()
+
+    def get_offset_repulsion(self, repulsion_x: list, repulsion_y: list) -> (np.ndarray, np.ndarray):
+        """
+        Calculates the offset repulsion points around the given repulsion points, see
+        get_offset_repulsion_mask.
 
         Args:
             repulsion_x (list): List of X coordinates for the repulsion points.
             repulsion_y (list): List of Y coordinates for the repulsion points.
 
         Returns:
-            tuple: Lists of X and Y coordinates for the offset repulsion points.
-        """
-        offset_x = []
-        offset_y = []
-        for x, y in zip(repulsion_x, repulsion_y):
-            for dx in range(-self.repulsion_offset, self.repulsion_offset + 1):
-                for dy in range(-self.repulsion_offset, self.repulsion_offset + 1):
-                    if dx == 0 and dy == 0:
-                        continue
-                    new_x = x + dx
-                    new_y = y + dy
-                    
-                    if self.is_inside_grid(new_x, new_y):
-                        if not self.__is_near_start_end(new_x, new_y):
-                            offset_x.append(new_x)
-                            offset_y.append(new_y)
-        
+            tuple: Arrays of X and Y coordinates of the unique offset repulsion points, in row-major order.
+        """
+        offset_y, offset_x = np.nonzero(self.get_offset_repulsion_mask(self.get_points_mask(repulsion_x, repulsion_y)))
         return offset_x, offset_y
 
+    def update_traversal_cost_on_grid(self, changed_cells):
+        """
+        Recomputes the traversal cost of cells whose obstacle flag or repulsion factor changed.
+        Call it after changing cells directly instead of through the put_* methods, it also
+        tells the planners to reload their snapshot of the grid. Once the clearance field
+        is built, obstacles put on or removed from these cells update it as well.
+
+        Args:
+            changed_cells (iterable): (x, y) of the changed cells.
+        """
+        changed_cells = list(changed_cells)
+        for x, y in changed_cells:
+            if self.is_inside_grid(x, y):
+                cell = self.grid[y][x]
+                self.traversal_cost[y, x] = math.inf if cell.obstacle else cell.repulsion_factor
+        if self.clearance is not None:
+            self.update_clearance_on_grid(changed_cells)
+        self.version += 1
+
     def put_distance_of_each_nodes_to_other_obstacles_on_grid(self, obstacle_x, obstacle_y):
         """
         Calculates and stores the distance of each node to other obstacles on the grid.
+        This costs a full grid pass per obstacle, put_clearance_on_grid stores the
+        nearest-obstacle distance for the whole map in one pass instead.
 
         Args:
             obstacle_x (int): X coordinate of the obstacle.
@@ -417,6 +814,55 @@ class Environment:
         for i in range(self.grid_h):
             for j in range(self.grid_w):
                 self.grid[i][j].total_obstacle_distance += self.euclidian_distance(obstacle_x, obstacle_y, self.grid[i][j].x, self.grid[i][j].y)
+        self.version += 1
+
+    def put_clearance_on_grid(self):
+        """
+        Builds the clearance field (distance of each node to its nearest obstacle) with a
+        Euclidean distance transform and stores it as total_obstacle_distance, in place of
+        the sum of distances to every obstacle. Cells of an obstacle-free map get the grid
+        diagonal.
+        """
+        self.clearance = ClearanceField(self.get_grid_arrays().obstacle)
+        distance = self.clearance.to_array(math.sqrt(math.pow(self.grid_w, 2) + math.pow(self.grid_h, 2)))
+        if isinstance(self.grid, GridArrays):
+            self.grid.total_obstacle_distance[...] = distance
+        else:
+            self.put_distance_field_on_grid(distance, 'total_obstacle_distance')
+        self.version += 1
+
+    def update_clearance_on_grid(self, changed_cells):
+        """
+        Updates the clearance field after obstacles were put on or removed from some cells,
+        touching only the nodes whose nearest obstacle changed.
+
+        Args:
+            changed_cells (iterable): (x, y) of the cells whose obstacle flag may have changed.
+        """
+        if self.clearance is None:
+            self.put_clearance_on_grid()
+            return
+        obstacle_cells, free_cells = [], []
+        for x, y in changed_cells:
+            if self.is_inside_grid(x, y):
+                (obstacle_cells if self.grid[y][x].obstacle else free_cells).append(y * self.grid_w + x)
+        diagonal = math.sqrt(math.pow(self.grid_w, 2) + math.pow(self.grid_h, 2))
+        for index in self.clearance.update_cells(obstacle_cells, free_cells):
+            self.grid[index // self.grid_w][index % self.grid_w].total_obstacle_distance = min(self.clearance.distance[index], diagonal)
+        self.version += 1
+
+    def update_clearance_on_mask(self, mask):
+        """
+        Updates the clearance field, if it is built, after the obstacle flag of the cells
+        of a mask changed.
+
+        Args:
+            mask (np.ndarray): (grid_h, grid_w) bool array of the changed cells.
+        """
+        if self.clearance is None:
+            return
+        changed_y, changed_x = np.nonzero(mask)
+        self.update_clearance_on_grid(zip(changed_x.tolist(), changed_y.tolist()))
 
     def __str__(self):
         """
@@ -440,6 +886,8 @@ class Environment:
             robot_path (list, optional): List of points representing the robot's path. Defaults to None.
             pause_time (int, optional): Pause time for the plot. Defaults to 1.
         """
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(1, 1, figsize=(12, 12))
         for i in range(self.grid_h):
             for j in range(self.grid_w):
@@ -489,4 +937,6 @@ class Environment:
         """
         Placeholder for plotting environment movement over time.
         """
+        import matplotlib.pyplot as plt
+
         fig, ax = plt.subplots(1, 1, figsize=(12, 12))
@@ -0,0 +1,251 @@
+import numpy as np
+
+
+class CellView:
+    """
+    Lightweight view of a single cell of a GridArrays grid.
+
+    Exposes the same attributes as node.Node so that callers using
+    `env.grid[y][x].k`-style access keep working, but every read and write
+    goes straight to the backing arrays.
+    """
+    __slots__ = ['arrays', 'x', 'y']
+
+    def __init__(self, arrays, x: int, y: int):
+        self.arrays = arrays
+        self.x = x
+        self.y = y
+
+    @property
+    def k(self):
+        value = self.arrays.k[self.y, self.x]
+        return None if np.isnan(value) else float(value)
+
+    @k.setter
+    def k(self, value):
+        self.arrays.k[self.y, self.x] = np.nan if value is None else value
+
+    @property
+    def b(self):
+        value = self.arrays.b[self.y, self.x]
+        return None if value < 0 else int(value)
+
+    @b.setter
+    def b(self, value):
+        self.arrays.b[self.y, self.x] = -1 if value is None else value
+
+    @property
+    def robot(self):
+        return bool(self.arrays.robot[self.y, self.x])
+
+    @robot.setter
+    def robot(self, value):
+        self.arrays.robot[self.y, self.x] = value
+
+    @property
+    def robot_movement(self):
+        return self.arrays.robot_movement[self.y, self.x].tolist()
+
+    @robot_movement.setter
+    def robot_movement(self, value):
+        self.arrays.robot_movement[self.y, self.x] = value
+
+    @property
+    def robot_distance(self):
+        return float(self.arrays.robot_distance[self.y, self.x])
+
+    @robot_distance.setter
+    def robot_distance(self, value):
+        self.arrays.robot_distance[self.y, self.x] = value
+
+    @property
+    def obstacle(self):
+        return bool(self.arrays.obstacle[self.y, self.x])
+
+    @obstacle.setter
+    def obstacle(self, value):
+        self.arrays.obstacle[self.y, self.x] = value
+        self.arrays.put_traversal_cost(self.x, self.y)
+
+    @property
+    def obstacle_movement(self):
+        return self.arrays.obstacle_movement[self.y, self.x].tolist()
+
+    @obstacle_movement.setter
+    def obstacle_movement(self, value):
+        self.arrays.obstacle_movement[self.y, self.x] = value
+
+    @property
+    def total_obstacle_distance(self):
+        return float(self.arrays.total_obstacle_distance[self.y, self.x])
+
+    @total_obstacle_distance.setter
+    def total_obstacle_distance(self, value):
+        self.arrays.total_obstacle_distance[self.y, self.x] = value
+
+    @property
+    def repulsion_factor(self):
+        return float(self.arrays.repulsion_factor[self.y, self.x])
+
+    @repulsion_factor.setter
+    def repulsion_factor(self, value):
+        self.arrays.repulsion_factor[self.y, self.x] = value
+        self.arrays.put_traversal_cost(self.x, self.y)
+
+    @property
+    def end(self):
+        return bool(self.arrays.end[self.y, self.x])
+
+    @end.setter
+    def end(self, value):
+        self.arrays.end[self.y, self.x] = value
+
+    @property
+    def end_distance(self):
+        return float(self.arrays.end_distance[self.y, self.x])
+
+    @end_distance.setter
+    def end_distance(self, value):
+        self.arrays.end_distance[self.y, self.x] = value
+
+    @property
+    def display(self):
+        return self.arrays.display
+
+    def __str__(self):
+        text = ''
+        for key in self.display:
+            value = getattr(self, key)
+            text = text + f'{key}: {value}, '
+        text = '[' + text[:-2] + ']'
+        return text
+
+    def __lt__(self, other):
+        return self.k < other.k
+
+
+class GridRow:
+    """
+    One row of a GridArrays grid, indexable by x and iterable like a list of cells.
+    """
+    __slots__ = ['arrays', 'y']
+
+    def __init__(self, arrays, y: int):
+        self.arrays = arrays
+        self.y = y
+
+    def __getitem__(self, x):
+        if x < 0:
+            x += self.arrays.grid_w
+        if not 0 <= x < self.arrays.grid_w:
+            raise IndexError('grid column index out of range')
+        return CellView(self.arrays, x, self.y)
+
+    def __len__(self):
+        return self.arrays.grid_w
+
+    def __iter__(self):
+        for x in range(self.arrays.grid_w):
+            yield CellView(self.arrays, x, self.y)
+
+
+class GridArrays:
+    """
+    Array-backed grid storage.
+
+    Every per-cell attribute of node.Node is held in one contiguous NumPy array
+    of shape (grid_h, grid_w) (or (grid_h, grid_w, 2) for the movement vectors),
+    instead of one Python object per cell. Indexing as `grid[y][x]` returns a
+    CellView, so it can be used wherever a list of lists of Node is expected.
+
+    `k` is stored as float64 with NaN meaning "not computed" because search
+    costs are accumulated along paths; the static layers use float32/int8/bool.
+
+    `traversal_cost` combines obstacle and repulsion_factor into the one layer the
+    planners read: inf on obstacles, the repulsion factor on repulsion cells and 0 on
+    free cells. Writes through a CellView keep it up to date.
+    """
+    __slots__ = ['grid_h', 'grid_w', 'display', 'k', 'b', 'robot', 'robot_movement', 'robot_distance', 'obstacle', 'obstacle_movement', 'total_obstacle_distance', 'repulsion_factor', 'traversal_cost', 'end', 'end_distance']
+
+    def __init__(self, grid_h: int, grid_w: int, display=[]):
+        """
+        Allocates the arrays for an empty grid.
+
+        Args:
+            grid_h (int): Height of the grid.
+            grid_w (int): Width of the grid.
+            display (list, optional): Cell attributes shown by CellView.__str__. Defaults to [].
+        """
+        self.grid_h = grid_h
+        self.grid_w = grid_w
+        self.display = display
+        self.k = np.full((grid_h, grid_w), np.nan, dtype=np.float64)
+        self.b = np.full((grid_h, grid_w), -1, dtype=np.int32)
+        self.robot = np.zeros((grid_h, grid_w), dtype=bool)
+        self.robot_movement = np.zeros((grid_h, grid_w, 2), dtype=np.float32)
+        self.robot_distance = np.zeros((grid_h, grid_w), dtype=np.float32)
+        self.obstacle = np.zeros((grid_h, grid_w), dtype=bool)
+        self.obstacle_movement = np.zeros((grid_h, grid_w, 2), dtype=np.int8)
+        self.total_obstacle_distance = np.zeros((grid_h, grid_w), dtype=np.float32)
+        self.repulsion_factor = np.zeros((grid_h, grid_w), dtype=np.float32)
+        self.traversal_cost = np.zeros((grid_h, grid_w), dtype=np.float32)
+        self.end = np.zeros((grid_h, grid_w), dtype=bool)
+        self.end_distance = np.zeros((grid_h, grid_w), dtype=np.float32)
+
+    @classmethod
+    def from_node_grid(cls, grid, display=[]):
+        """
+        Builds a GridArrays snapshot of a list-of-lists grid of node.Node.
+
+        Args:
+            grid (list): 2D list of nodes, indexed as grid[y][x].
+            display (list, optional): Cell attributes shown by CellView.__str__. Defaults to [].
+
+        Returns:
+            GridArrays: A copy of the node attributes as arrays.
+        """
+        arrays = cls(len(grid), len(grid[0]) if grid else 0, display)
+        for y, row in enumerate(grid):
+            for x, cell in enumerate(row):
+                if cell.k is not None:
+                    arrays.k[y, x] = cell.k
+                arrays.robot[y, x] = cell.robot
+                arrays.robot_movement[y, x] = cell.robot_movement
+                arrays.robot_distance[y, x] = cell.robot_distance
+                arrays.obstacle[y, x] = cell.obstacle
+                arrays.obstacle_movement[y, x] = cell.obstacle_movement
+                arrays.total_obstacle_distance[y, x] = cell.total_obstacle_distance
+                arrays.repulsion_factor[y, x] = cell.repulsion_factor
+                arrays.end[y, x] = cell.end
+                arrays.end_distance[y, x] = cell.end_distance
+        arrays.put_traversal_costs()
+        return arrays
+
+    def put_traversal_cost(self, x, y):
+        """
+        Recomputes traversal_cost of one cell from its obstacle flag and repulsion factor.
+        """
+        self.traversal_cost[y, x] = np.inf if self.obstacle[y, x] else self.repulsion_factor[y, x]
+
+    def put_traversal_costs(self, mask=None):
+        """
+        Recomputes traversal_cost of the cells of a (grid_h, grid_w) bool mask, or of every cell.
+        """
+        if mask is None:
+            self.traversal_cost[...] = np.where(self.obstacle, np.inf, self.repulsion_factor)
+        else:
+            self.traversal_cost[mask] = np.where(self.obstacle[mask], np.inf, self.repulsion_factor[mask])
+
+    def __getitem__(self, y):
+        if y < 0:
+            y += self.grid_h
+        if not 0 <= y < self.grid_h:
+            raise IndexError('grid row index out of range')
+        return GridRow(self, y)
+
+    def __len__(self):
+        return self.grid_h
+
+    def __iter__(self):
+        for y in range(self.grid_h):
+            yield GridRow(self, y)
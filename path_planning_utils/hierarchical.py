@@ -0,0 +1,299 @@
+import math
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.bstar import PathPlanner
+from singaboat_vrx.custom_plan1.path_planning_utils.priority_queue import PriorityQueue
+
+
+class HierarchicalPlanner(PathPlanner):
+    """
+    HPA*-style planner: the grid is split into cluster_size x cluster_size clusters.
+
+    Entrances are the free cell pairs across each cluster border: the middle of every
+    free run, or both ends of runs of 6 cells or more. With queen movement, clusters that
+    touch only at a corner share a border too, and a diagonal crossing is an entrance
+    wherever no orthogonal crossing reaches the same cells, since it passes between two
+    blocked cells. Costs between the entrances of a cluster are precomputed with a search
+    bounded to that cluster. A query searches the small abstract graph and then refines
+    only the clusters on the chosen route at full resolution.
+
+    Blocked cells (obstacles and repulsion) are impassable, as in is_free_to_move. The
+    result is near-optimal, since routes are forced through the entrances.
+    """
+
+    def __init__(self, environment, obstacle_penalty, repulsion_penalty, cluster_size=10, movement='queen'):
+        super().__init__(environment, obstacle_penalty, repulsion_penalty)
+        if movement not in ('queen', 'rook'):
+            raise ValueError(f"Hierarchical planning supports 'queen' and 'rook' movement, got {movement!r}")
+        self.cluster_size = cluster_size
+        self.movement = movement
+        self.clusters_w = math.ceil(environment.grid_w / cluster_size)
+        self.clusters_h = math.ceil(environment.grid_h / cluster_size)
+        # (dx, dy) from a cluster to the clusters it shares a border with, the other half
+        # of the borders is found from the neighbouring clusters
+        self.border_offsets = [(1, 0), (0, 1)] + ([(1, 1), (-1, 1)] if movement == 'queen' else [])
+        self.free = None
+        # (cluster_a, cluster_b) -> [(index_a, index_b), ...] entrance transitions of a border
+        self.transitions = {}
+        # index -> [(index, cost), ...] crossings to the neighbouring clusters
+        self.inter_edges = {}
+        # cluster -> set of entrance indices
+        self.cluster_nodes = {}
+        # cluster -> {index: [(index, cost), ...]} paths between entrances inside the cluster
+        self.intra_edges = {}
+        self.path = np.empty((0, 2), dtype=np.int64)
+        self.expanded = 0
+
+    def get_cluster(self, index):
+        grid_w = self.environment.grid_w
+        return (index % grid_w) // self.cluster_size, (index // grid_w) // self.cluster_size
+
+    def get_cluster_bounds(self, cluster):
+        cx, cy = cluster
+        x0, y0 = cx * self.cluster_size, cy * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.environment.grid_w), min(y0 + self.cluster_size, self.environment.grid_h)
+
+    def search_within_cluster(self, start, cluster, goal=-1):
+        """
+        Uniform-cost search from a cell that never leaves one cluster.
+
+        Args:
+            start (int): Flat index of the start cell, expanded even when blocked.
+            cluster (tuple): (cx, cy) of the cluster.
+            goal (int, optional): Flat index to stop at. Defaults to -1, searching the whole cluster.
+
+        Returns:
+            tuple: (costs, parents) dicts of the reached cells.
+        """
+        grid_w = self.environment.grid_w
+        x0, y0, x1, y1 = self.get_cluster_bounds(cluster)
+        free = self.free
+        table = self.get_neighbour_table(self.movement, 1)
+        costs, parents = {start: 0.0}, {start: -1}
+        closed = set()
+        open_list = PriorityQueue()
+        open_list.push(start, 0.0)
+        while open_list:
+            k, current = open_list.pop()
+            closed.add(current)
+            if current == goal:
+                break
+            x, y = current % grid_w, current // grid_w
+            for dx, dy, step_cost, delta in table:
+                if not (x0 <= x + dx < x1 and y0 <= y + dy < y1):
+                    continue
+                index = current + delta
+                if (free[index] or index == goal) and index not in closed and k + step_cost < costs.get(index, math.inf):
+                    costs[index] = k + step_cost
+                    parents[index] = current
+                    open_list.push(index, k + step_cost)
+        return costs, parents
+
+    def trace(self, parents, index):
+        # Cells from the start of a search_within_cluster to index
+        cells = [index]
+        while parents[cells[-1]] >= 0:
+            cells.append(parents[cells[-1]])
+        return cells[::-1]
+
+    def get_borders(self, clusters):
+        # Borders from each cluster to the clusters at border_offsets
+        borders = []
+        for cx, cy in clusters:
+            for dx, dy in self.border_offsets:
+                if 0 <= cx + dx < self.clusters_w and cy + dy < self.clusters_h:
+                    borders.append(((cx, cy), (cx + dx, cy + dy)))
+        return borders
+
+    def find_border_transitions(self, cluster_a, cluster_b):
+        # Entrance pairs across the border between two adjacent clusters (b right of, below,
+        # or diagonally below a)
+        grid_w = self.environment.grid_w
+        free = self.free
+        ax0, ay0, ax1, ay1 = self.get_cluster_bounds(cluster_a)
+        dx, dy = cluster_b[0] - cluster_a[0], cluster_b[1] - cluster_a[1]
+        if dx and dy:
+            # Clusters touching at a corner: the corner cells, unless a third cluster links them
+            x = ax1 - 1 if dx > 0 else ax0
+            index_a, index_b = (ay1 - 1) * grid_w + x, ay1 * grid_w + x + dx
+            if free[index_a] and free[index_b] and not free[index_a + dx] and not free[index_b - dx]:
+                return [(index_a, index_b)]
+            return []
+        if dx:
+            pairs = [(y * grid_w + ax1 - 1, y * grid_w + ax1) for y in range(ay0, ay1)]
+        else:
+            pairs = [((ay1 - 1) * grid_w + x, ay1 * grid_w + x) for x in range(ax0, ax1)]
+        transitions = []
+        if self.movement == 'queen':
+            # Diagonal crossings between the two blocked cells of neighbouring pairs
+            for (p_a, p_b), (q_a, q_b) in zip(pairs[:-1], pairs[1:]):
+                if free[p_a] and free[q_b] and not free[p_b] and not free[q_a]:
+                    transitions.append((p_a, q_b))
+                elif free[q_a] and free[p_b] and not free[q_b] and not free[p_a]:
+                    transitions.append((q_a, p_b))
+        run = []
+        for pair in pairs + [None]:
+            if pair is not None and free[pair[0]] and free[pair[1]]:
+                run.append(pair)
+                continue
+            if len(run) >= 6:
+                transitions += [run[0], run[-1]]
+            elif run:
+                transitions.append(run[len(run) // 2])
+            run = []
+        return transitions
+
+    def get_borders_of_cell(self, index):
+        # Cluster borders whose entrances may depend on the cell: the borders between the
+        # clusters of its 3x3 neighbourhood, as a corner entrance depends on cells of a
+        # third and fourth cluster
+        grid_w, size = self.environment.grid_w, self.cluster_size
+        x, y = index % grid_w, index // grid_w
+        clusters = {(nx // size, ny // size) for nx in range(x - 1, x + 2) for ny in range(y - 1, y + 2) if self.is_inside_grid(nx, ny)}
+        return [border for border in self.get_borders(clusters) if border[1] in clusters]
+
+    def rebuild(self, borders, clusters):
+        """
+        Recomputes the entrances of some borders and the intra-cluster costs of some clusters.
+        """
+        for cluster_a, cluster_b in borders:
+            self.transitions[(cluster_a, cluster_b)] = self.find_border_transitions(cluster_a, cluster_b)
+        grid_w = self.environment.grid_w
+        self.inter_edges = {}
+        self.cluster_nodes = {}
+        for transitions in self.transitions.values():
+            for index_a, index_b in transitions:
+                cost = math.hypot(index_b % grid_w - index_a % grid_w, index_b // grid_w - index_a // grid_w)
+                self.inter_edges.setdefault(index_a, []).append((index_b, cost))
+                self.inter_edges.setdefault(index_b, []).append((index_a, cost))
+                self.cluster_nodes.setdefault(self.get_cluster(index_a), set()).add(index_a)
+                self.cluster_nodes.setdefault(self.get_cluster(index_b), set()).add(index_b)
+        for cluster in clusters:
+            nodes = self.cluster_nodes.get(cluster, set())
+            edges = {}
+            for node in nodes:
+                costs, _ = self.search_within_cluster(node, cluster)
+                edges[node] = [(other, costs[other]) for other in nodes if other != node and other in costs]
+            self.intra_edges[cluster] = edges
+
+    def build_abstract_graph(self):
+        """
+        Snapshots the environment and precomputes the entrances and intra-cluster costs of every cluster.
+        """
+        self.free = list(self.get_static_map().free)
+        clusters = [(cx, cy) for cy in range(self.clusters_h) for cx in range(self.clusters_w)]
+        self.transitions = {}
+        self.intra_edges = {}
+        self.rebuild(self.get_borders(clusters), clusters)
+
+    def update_cells(self, changed_cells):
+        """
+        Invalidates only the clusters (and borders) holding cells whose obstacle or repulsion state changed.
+
+        Args:
+            changed_cells (iterable): (x, y) of the changed cells.
+
+        Returns:
+            set: (cx, cy) of the rebuilt clusters.
+        """
+        if self.free is None:
+            self.build_abstract_graph()
+            return set(self.intra_edges)
+        changed_cells = list(changed_cells)
+        self.environment.update_traversal_cost_on_grid(changed_cells)
+        grid_w = self.environment.grid_w
+        borders, clusters = set(), set()
+        for x, y in changed_cells:
+            if not self.is_inside_grid(x, y):
+                continue
+            index = y * grid_w + x
+            free = self.is_free_to_move(x, y)
+            if free == self.free[index]:
+                continue
+            self.free[index] = free
+            clusters.add(self.get_cluster(index))
+            for border in self.get_borders_of_cell(index):
+                borders.add(border)
+                clusters.update(border)
+        if clusters:
+            self.rebuild(borders, clusters)
+        return clusters
+
+    def calculate_hierarchical_cost_from_robot_to_end(self):
+        """
+        Searches the abstract graph from the robot to the end and refines the chosen route.
+
+        Returns:
+            float: Cost of the refined path, nan if the end is unreachable.
+        """
+        if self.free is None:
+            self.build_abstract_graph()
+        env = self.environment
+        grid_w = env.grid_w
+        start, goal = env.robot_y * grid_w + env.robot_x, env.end_y * grid_w + env.end_x
+        start_cluster, goal_cluster = self.get_cluster(start), self.get_cluster(goal)
+        start_costs, start_parents = self.search_within_cluster(start, start_cluster)
+        goal_costs, goal_parents = self.search_within_cluster(goal, goal_cluster)
+
+        def neighbours(node):
+            if node == start:
+                # A start on an entrance also crosses its border directly
+                edges = [(other, start_costs[other]) for other in self.cluster_nodes.get(start_cluster, ()) if other in start_costs]
+                edges += self.inter_edges.get(start, [])
+                if goal in start_costs:
+                    edges.append((goal, start_costs[goal]))
+                return edges
+            edges = self.intra_edges.get(self.get_cluster(node), {}).get(node, []) + self.inter_edges.get(node, [])
+            if node in goal_costs and self.get_cluster(node) == goal_cluster:
+                edges = edges + [(goal, goal_costs[node])]
+            return edges
+
+        gx, gy = env.end_x, env.end_y
+        costs, parents, closed = {start: 0.0}, {start: -1}, set()
+        open_list = PriorityQueue()
+        open_list.push(start, 0.0)
+        self.expanded = 0
+        while open_list:
+            _, current = open_list.pop()
+            closed.add(current)
+            self.expanded += 1
+            if current == goal:
+                break
+            for other, cost in neighbours(current):
+                cost += costs[current]
+                if other not in closed and cost < costs.get(other, math.inf):
+                    costs[other] = cost
+                    parents[other] = current
+                    ox, oy = other % grid_w, other // grid_w
+                    open_list.push(other, cost + math.hypot(ox - gx, oy - gy))
+        if goal not in closed:
+            self.path = np.empty((0, 2), dtype=np.int64)
+            return math.nan
+
+        route = self.trace(parents, goal)
+        # Every segment starts on the last cell of the previous one, a start on the goal is a single cell
+        cells = [start]
+        for a, b in zip(route[:-1], route[1:]):
+            if a == start:
+                segment = self.trace(start_parents, b) if b in start_parents else [a, b]
+            elif b == goal and a in goal_parents:
+                segment = self.trace(goal_parents, a)[::-1]
+            elif self.get_cluster(a) == self.get_cluster(b):
+                _, segment_parents = self.search_within_cluster(a, self.get_cluster(a), b)
+                segment = self.trace(segment_parents, b)
+            else:
+                segment = [a, b]
+            cells += segment[1:]
+        cells = np.array(cells, dtype=np.int64)
+        self.path = np.stack((cells % grid_w, cells // grid_w), axis=1)
+        return float(np.hypot(*np.diff(self.path, axis=0).T).sum())
+
+    def raw_path_finder_from_robot_to_end(self, movement='queen', vectorized=False, context=None):
+        if context is not None:
+            return super().raw_path_finder_from_robot_to_end(movement, vectorized, context)
+        return self.path, np.diff(self.path, axis=0)
+
+    def raw_path_finder_from_end_to_robot(self, movement='queen', vectorized=False, context=None):
+        if context is not None:
+            return super().raw_path_finder_from_end_to_robot(movement, vectorized, context)
+        path = self.path[::-1]
+        return path, np.diff(path, axis=0)
@@ -0,0 +1,169 @@
+import math
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.bstar import PathPlanner
+from singaboat_vrx.custom_plan1.path_planning_utils.search_context import SearchContext
+
+SQRT_2 = math.sqrt(2)
+
+
+class JumpPointPlanner(PathPlanner):
+    """
+    Jump Point Search from the robot to the end for the 'queen' movement model.
+
+    Straight and diagonal runs through open water are scanned without touching the
+    open list. Only cells with a forced neighbour (next to an obstacle corner) and
+    the end become jump points, which cuts expansions and heap traffic on sparse maps.
+
+    Blocked cells (obstacles and repulsion) are impassable, as in is_free_to_move.
+    Every free neighbour is reachable, diagonals included, as in PathPlanner. Path
+    costs therefore equal those of a uniform-cost search on the same grid.
+    """
+
+    def __init__(self, environment, obstacle_penalty, repulsion_penalty):
+        super().__init__(environment, obstacle_penalty, repulsion_penalty)
+        self.pushes = 0
+
+    def octile_distance(self, x1, y1, x2, y2):
+        dx, dy = abs(x2 - x1), abs(y2 - y1)
+        return max(dx, dy) + (SQRT_2 - 1) * min(dx, dy)
+
+    def is_walkable(self, free, x, y, goal_x, goal_y):
+        return 0 <= x < self.environment.grid_w and 0 <= y < self.environment.grid_h and (free[y * self.environment.grid_w + x] or (x, y) == (goal_x, goal_y))
+
+    def get_pruned_directions(self, free, x, y, dx, dy, goal_x, goal_y):
+        # Natural and forced successors of a cell reached moving in (dx, dy)
+        walkable = self.is_walkable
+        if dx == 0 and dy == 0:
+            return [(ox, oy) for ox, oy in self.find_all_neighbour_offsets('queen', 1)]
+        if dx and dy:
+            directions = [(dx, 0), (0, dy), (dx, dy)]
+            if not walkable(free, x - dx, y, goal_x, goal_y):
+                directions.append((-dx, dy))
+            if not walkable(free, x, y - dy, goal_x, goal_y):
+                directions.append((dx, -dy))
+        elif dx:
+            directions = [(dx, 0)]
+            if not walkable(free, x, y + 1, goal_x, goal_y):
+                directions.append((dx, 1))
+            if not walkable(free, x, y - 1, goal_x, goal_y):
+                directions.append((dx, -1))
+        else:
+            directions = [(0, dy)]
+            if not walkable(free, x + 1, y, goal_x, goal_y):
+                directions.append((1, dy))
+            if not walkable(free, x - 1, y, goal_x, goal_y):
+                directions.append((-1, dy))
+        return directions
+
+    def jump(self, free, x, y, dx, dy, goal_x, goal_y):
+        """
+        Scans from (x, y) in direction (dx, dy) until it finds a jump point.
+
+        Returns:
+            tuple: (x, y) of the jump point, or None if the scan runs into a blocked cell or the border.
+        """
+        walkable = self.is_walkable
+        while True:
+            x += dx
+            y += dy
+            if not walkable(free, x, y, goal_x, goal_y):
+                return None
+            if (x, y) == (goal_x, goal_y):
+                return x, y
+            if dx and dy:
+                if (not walkable(free, x - dx, y, goal_x, goal_y) and walkable(free, x - dx, y + dy, goal_x, goal_y)) or \
+                        (not walkable(free, x, y - dy, goal_x, goal_y) and walkable(free, x + dx, y - dy, goal_x, goal_y)):
+                    return x, y
+                # A diagonal cell from which a straight scan finds something is itself a jump point
+                if self.jump(free, x, y, dx, 0, goal_x, goal_y) is not None or self.jump(free, x, y, 0, dy, goal_x, goal_y) is not None:
+                    return x, y
+            elif dx:
+                if (not walkable(free, x, y + 1, goal_x, goal_y) and walkable(free, x + dx, y + 1, goal_x, goal_y)) or \
+                        (not walkable(free, x, y - 1, goal_x, goal_y) and walkable(free, x + dx, y - 1, goal_x, goal_y)):
+                    return x, y
+            else:
+                if (not walkable(free, x + 1, y, goal_x, goal_y) and walkable(free, x + 1, y + dy, goal_x, goal_y)) or \
+                        (not walkable(free, x - 1, y, goal_x, goal_y) and walkable(free, x - 1, y + dy, goal_x, goal_y)):
+                    return x, y
+
+    def calculate_jump_point_cost_from_robot_to_end(self, movement='queen'):
+        """
+        Runs Jump Point Search from the robot to the end.
+
+        Args:
+            movement (str, optional): Movement type, only 'queen' is supported. Defaults to 'queen'.
+
+        Returns:
+            float: Cost of the shortest path, nan if the end is unreachable.
+        """
+        if movement != 'queen':
+            raise ValueError(f"Jump Point Search supports only 'queen' movement, got {movement!r}")
+        env = self.environment
+        grid_w = env.grid_w
+        goal_x, goal_y = env.end_x, env.end_y
+        context = self.new_search_context()
+        costs, parents, state, open_list = context.costs, context.parents, context.state, context.open
+        free = context.static_map.free
+        start, goal = env.robot_y * grid_w + env.robot_x, goal_y * grid_w + goal_x
+        costs[start] = 0.0
+        state[start] = SearchContext.OPEN
+        open_list.push(start, self.octile_distance(env.robot_x, env.robot_y, goal_x, goal_y))
+        self.pushes = 1
+        while open_list:
+            _, current = open_list.pop()
+            state[current] = SearchContext.CLOSED
+            context.expanded += 1
+            if current == goal:
+                break
+            x, y = current % grid_w, current // grid_w
+            parent = parents[current]
+            if parent < 0:
+                dx = dy = 0
+            else:
+                px, py = parent % grid_w, parent // grid_w
+                dx, dy = (x > px) - (x < px), (y > py) - (y < py)
+            for direction_x, direction_y in self.get_pruned_directions(free, x, y, dx, dy, goal_x, goal_y):
+                jump_point = self.jump(free, x, y, direction_x, direction_y, goal_x, goal_y)
+                if jump_point is None:
+                    continue
+                jx, jy = jump_point
+                index = jy * grid_w + jx
+                if state[index] == SearchContext.CLOSED:
+                    continue
+                cost = costs[current] + self.octile_distance(x, y, jx, jy)
+                if state[index] == SearchContext.UNVISITED or cost < costs[index]:
+                    costs[index] = cost
+                    parents[index] = current
+                    state[index] = SearchContext.OPEN
+                    open_list.push(index, cost + self.octile_distance(jx, jy, goal_x, goal_y))
+                    self.pushes += 1
+        return costs[goal]
+
+    def raw_path_finder_from_robot_to_end(self, movement='queen', vectorized=False, context=None):
+        """
+        Expands the jump points of the last search into every cell along the way.
+
+        Returns:
+            tuple: (path, orientation) arrays from the robot to the end, both empty if the search failed.
+        """
+        if context is not None:
+            return super().raw_path_finder_from_robot_to_end(movement, vectorized, context)
+        env = self.environment
+        jump_points = self.context.trace_parents(env.end_x, env.end_y)[::-1] if self.context is not None else []
+        if len(jump_points) == 0:
+            return np.empty((0, 2), dtype=np.int64), np.empty((0, 2), dtype=np.int64)
+        path = [jump_points[0]]
+        for (x1, y1), (x2, y2) in zip(jump_points[:-1].tolist(), jump_points[1:].tolist()):
+            # Consecutive jump points are joined by a straight or a diagonal run
+            steps = max(abs(x2 - x1), abs(y2 - y1))
+            step = np.array([np.sign(x2 - x1), np.sign(y2 - y1)])
+            path.append(np.array([x1, y1]) + step * np.arange(1, steps + 1)[:, None])
+        path = np.vstack(path)
+        return path, np.diff(path, axis=0)
+
+    def raw_path_finder_from_end_to_robot(self, movement='queen', vectorized=False, context=None):
+        if context is not None:
+            return super().raw_path_finder_from_end_to_robot(movement, vectorized, context)
+        path, _ = self.raw_path_finder_from_robot_to_end(movement)
+        path = path[::-1]
+        return path, np.diff(path, axis=0)
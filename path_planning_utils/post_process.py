@@ -1,11 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.interpolate import splprep, splev
-from rdp import rdp
 
 class PostPlanner:
     def __init__(self, path_points, repulsions_x, repulsions_y, epsilon=1.0, spline_smoothness=5, spline_degree=2, max_distance=5):
-        self.path_points = np.array(path_points)
+        self.path_points = np.asarray(path_points)
         self.repulsions_x = np.array(repulsions_x)
         self.repulsions_y = np.array(repulsions_y)
         self.epsilon = epsilon
@@ -22,6 +19,8 @@ class PostPlanner:
         return self.path_points[closest_index]
 
     def simplify_path(self):
+        from rdp import rdp
+
         if len(self.path_points) < 6:
             return self.path_points
         
@@ -48,6 +47,7 @@ class PostPlanner:
         return np.array(refined_path)
 
     def get_b_spline(self, degree,num_points=500):
+        from scipy.interpolate import splprep, splev
         
         x = self.reduced_path_points[:, 0]
         y = self.reduced_path_points[:, 1]
@@ -88,6 +88,8 @@ class PostPlanner:
         return min_distance, closest_spline_point
     
     def calculate_max_curvature(self, x_fine, y_fine):
+        from scipy.interpolate import splprep, splev
+
         # Calculate first derivatives
         tck, _ = splprep([x_fine, y_fine], s=0, k=self.spline_degree)
         u_fine = np.linspace(0, 1, len(x_fine))
@@ -142,6 +144,8 @@ class PostPlanner:
 
 
     def plot(self):
+        import matplotlib.pyplot as plt
+
         x_fine, y_fine, min_distance = self.infer_spline()
        
         
@@ -0,0 +1,120 @@
+import heapq
+import itertools
+
+
+class PriorityQueue:
+    """
+    Min-priority queue with O(log n) decrease-key, built on heapq.
+
+    Entries are [priority, count, item] lists. The insertion counter breaks ties
+    between equal priorities in FIFO order, so items themselves are never
+    compared. Updating an item marks its old entry as stale instead of searching
+    for it, and stale entries are skipped when they reach the top of the heap.
+    """
+    __slots__ = ['heap', 'entries', 'counter']
+
+    REMOVED = object()
+
+    def __init__(self):
+        self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
+
+    def push(self, item, priority):
+        """
+        Adds an item, or changes its priority if it is already queued.
+
+        Args:
+            item (hashable): The item to queue.
+            priority (float): Priority of the item, lowest is popped first.
+        """
+        entry = self.entries.get(item)
+        if entry is not None:
+            entry[-1] = self.REMOVED
+        entry = [priority, next(self.counter), item]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
+
+    def decrease_key(self, item, priority):
+        """
+        Lowers the priority of a queued item. Higher priorities are ignored.
+
+        Args:
+            item (hashable): The queued item.
+            priority (float): The new priority.
+
+        Returns:
+            bool: True if the priority was lowered.
+        """
+        entry = self.entries.get(item)
+        if entry is None or priority >= entry[0]:
+            return False
+        self.push(item, priority)
+        return True
+
+    def remove(self, item):
+        """
+        Removes a queued item.
+
+        Args:
+            item (hashable): The queued item.
+        """
+        entry = self.entries.pop(item)
+        entry[-1] = self.REMOVED
+
+    def discard_stale(self):
+        """
+        Pops stale entries off the top of the heap.
+        """
+        heap = self.heap
+        while heap and heap[0][-1] is self.REMOVED:
+            heapq.heappop(heap)
+
+    def peek(self):
+        """
+        Returns the lowest priority entry without removing it.
+
+        Returns:
+            tuple: (priority, item)
+        """
+        self.discard_stale()
+        priority, _, item = self.heap[0]
+        return priority, item
+
+    def pop(self):
+        """
+        Removes and returns the lowest priority entry.
+
+        Returns:
+            tuple: (priority, item)
+        """
+        self.discard_stale()
+        priority, _, item = heapq.heappop(self.heap)
+        del self.entries[item]
+        return priority, item
+
+    def priority(self, item):
+        """
+        Returns the current priority of a queued item.
+        """
+        return self.entries[item][0]
+
+    def clear(self):
+        """
+        Removes every item.
+        """
+        self.heap.clear()
+        self.entries.clear()
+
+    def __contains__(self, item):
+        return item in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def __iter__(self):
+        for item, entry in self.entries.items():
+            yield entry[0], item
@@ -0,0 +1,205 @@
+import hashlib
+import math
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.priority_queue import PriorityQueue
+
+
+class StaticMap:
+    """
+    Read-only flat (y * grid_w + x) snapshot of the Environment layers the search
+    reads. It is built once per map and shared by every query.
+    """
+    __slots__ = ['grid_h', 'grid_w', 'traversal_cost', 'free', 'robot_distance', 'end_distance', 'total_obstacle_distance', 'digest']
+
+    LAYER_COUNT = 4
+
+    def __init__(self, arrays):
+        """
+        Builds the snapshot from the grid arrays of an Environment.
+
+        Args:
+            arrays (GridArrays): Array view of the environment grid.
+        """
+        self.grid_h = arrays.grid_h
+        self.grid_w = arrays.grid_w
+        self.put_traversal_cost(arrays.traversal_cost.ravel())
+        self.robot_distance = arrays.robot_distance.ravel().tolist()
+        self.end_distance = arrays.end_distance.ravel().tolist()
+        self.total_obstacle_distance = arrays.total_obstacle_distance.ravel().tolist()
+        self.digest = None
+
+    @classmethod
+    def from_layers(cls, grid_h, grid_w, layers):
+        """
+        Rebuilds a static map from the array returned by layers(), e.g. one attached from shared memory.
+
+        Args:
+            grid_h (int): Height of the grid.
+            grid_w (int): Width of the grid.
+            layers (np.ndarray): (LAYER_COUNT, grid_h * grid_w) float64 array.
+
+        Returns:
+            StaticMap: The rebuilt static map.
+        """
+        static_map = cls.__new__(cls)
+        static_map.grid_h = grid_h
+        static_map.grid_w = grid_w
+        static_map.put_traversal_cost(layers[0])
+        static_map.robot_distance = layers[1].tolist()
+        static_map.end_distance = layers[2].tolist()
+        static_map.total_obstacle_distance = layers[3].tolist()
+        static_map.digest = None
+        return static_map
+
+    def fingerprint(self):
+        """
+        Returns a digest of the layers that decide search costs (grid size and traversal
+        cost), computed once since the static map is never modified.
+
+        Returns:
+            str: Hex digest identifying the map.
+        """
+        if self.digest is None:
+            self.digest = self.get_fingerprint(self.grid_h, self.grid_w, self.traversal_cost)
+        return self.digest
+
+    @staticmethod
+    def get_fingerprint(grid_h, grid_w, traversal_cost):
+        """
+        Hashes a traversal cost layer the way fingerprint does, e.g. the live
+        Environment.traversal_cost to check a snapshot against it.
+
+        Args:
+            grid_h (int): Height of the grid.
+            grid_w (int): Width of the grid.
+            traversal_cost (array-like): Flat or (grid_h, grid_w) traversal costs.
+
+        Returns:
+            str: Hex digest identifying the map.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.array([grid_h, grid_w], dtype=np.int64).tobytes())
+        digest.update(np.ascontiguousarray(traversal_cost, dtype=np.float32).tobytes())
+        return digest.hexdigest()
+
+    def put_traversal_cost(self, traversal_cost):
+        """
+        Stores the flat traversal cost layer and the free cells (cost 0) it leaves.
+        """
+        self.traversal_cost = traversal_cost.tolist()
+        self.free = (traversal_cost == 0).tolist()
+
+    def layers(self, out=None):
+        """
+        Packs the static map into one (LAYER_COUNT, grid_h * grid_w) float64 array:
+        traversal_cost, robot_distance, end_distance and total_obstacle_distance.
+
+        Args:
+            out (np.ndarray, optional): Array to write into, e.g. backed by shared memory. Defaults to None.
+
+        Returns:
+            np.ndarray: The packed layers.
+        """
+        if out is None:
+            out = np.empty((self.LAYER_COUNT, self.grid_h * self.grid_w), dtype=np.float64)
+        out[0] = self.traversal_cost
+        out[1] = self.robot_distance
+        out[2] = self.end_distance
+        out[3] = self.total_obstacle_distance
+        return out
+
+
+class SearchContext:
+    """
+    State of a single search query: cost, parent and visited flag of every cell,
+    plus its open list. Several contexts can run against one StaticMap, so one
+    prepared Environment can serve many queries, including concurrent ones.
+    """
+    __slots__ = ['static_map', 'costs', 'parents', 'state', 'open', 'expanded']
+
+    UNVISITED, OPEN, CLOSED = 0, 1, 2
+
+    def __init__(self, static_map):
+        """
+        Initializes an empty search over a static map.
+
+        Args:
+            static_map (StaticMap): The map being searched.
+        """
+        size = static_map.grid_h * static_map.grid_w
+        self.static_map = static_map
+        self.costs = [math.nan] * size
+        self.parents = [-1] * size
+        self.state = bytearray(size)
+        self.open = PriorityQueue()
+        self.expanded = 0
+
+    @property
+    def closed(self):
+        """
+        set: (x, y) of every expanded cell.
+        """
+        grid_w = self.static_map.grid_w
+        return {(index % grid_w, index // grid_w) for index, state in enumerate(self.state) if state == self.CLOSED}
+
+    @property
+    def open_set(self):
+        """
+        set: (x, y) of every cell in the open list.
+        """
+        grid_w = self.static_map.grid_w
+        return {(index % grid_w, index // grid_w) for index in self.open.entries}
+
+    def freeze(self):
+        """
+        Converts a finished search to compact arrays (float64 costs, int32 parents) and
+        drops its open list, e.g. before caching it. Path extraction still works on it.
+
+        Returns:
+            SearchContext: self
+        """
+        self.costs = np.array(self.costs, dtype=np.float64)
+        self.parents = np.array(self.parents, dtype=np.int32)
+        self.open.clear()
+        return self
+
+    @property
+    def nbytes(self):
+        """
+        int: Approximate memory held by the context.
+        """
+        if isinstance(self.costs, np.ndarray):
+            return self.costs.nbytes + self.parents.nbytes + len(self.state)
+        # Python lists hold an 8 byte pointer per cell plus a 24 byte float per reached cell
+        return len(self.costs) * 16 + len(self.state) + 24 * self.expanded
+
+    def cost_array(self):
+        """
+        Returns the costs as a (grid_h, grid_w) array, NaN meaning "not reached".
+
+        Returns:
+            np.ndarray: The cost of every cell.
+        """
+        return np.array(self.costs, dtype=np.float64).reshape(self.static_map.grid_h, self.static_map.grid_w)
+
+    def trace_parents(self, x, y):
+        """
+        Follows the parent pointers from a reached cell back to the start of the search.
+
+        Args:
+            x (int): X coordinate of the cell.
+            y (int): Y coordinate of the cell.
+
+        Returns:
+            np.ndarray: (n, 2) array of [x, y] from the cell to the search start, empty if the cell was not reached.
+        """
+        grid_w = self.static_map.grid_w
+        index = y * grid_w + x
+        if math.isnan(self.costs[index]):
+            return np.empty((0, 2), dtype=np.int64)
+        indices = [index]
+        while self.parents[index] >= 0:
+            index = self.parents[index]
+            indices.append(index)
+        indices = np.array(indices, dtype=np.int64)
+        return np.stack((indices % grid_w, indices // grid_w), axis=1)
@@ -0,0 +1,183 @@
+import math
+import numpy as np
+from singaboat_vrx.custom_plan1.path_planning_utils.bstar import PathPlanner
+from singaboat_vrx.custom_plan1.path_planning_utils.priority_queue import PriorityQueue
+
+
+class ReservationTable:
+    """
+    Cells occupied by moving obstacles at each timestep, stored as one set of
+    t * grid_h * grid_w + y * grid_w + x keys. Lookups are O(1), and the memory used
+    grows with the number of reserved cells, not with the grid area times the horizon.
+    """
+    __slots__ = ['grid_h', 'grid_w', 'horizon', 'reserved']
+
+    def __init__(self, grid_h, grid_w, horizon):
+        """
+        Initializes an empty table.
+
+        Args:
+            grid_h (int): Height of the grid.
+            grid_w (int): Width of the grid.
+            horizon (int): Number of predicted timesteps; later timesteps are never reserved.
+        """
+        self.grid_h = grid_h
+        self.grid_w = grid_w
+        self.horizon = horizon
+        self.reserved = set()
+
+    @classmethod
+    def from_environment(cls, environment, horizon=None):
+        """
+        Builds the table from the obstacles of an environment that have a non-zero dx, dy.
+
+        Args:
+            environment (Environment): Environment holding the obstacle trajectories.
+            horizon (int, optional): Defaults to the length of the predicted obstacle paths (the grid diagonal).
+
+        Returns:
+            ReservationTable: The filled table.
+        """
+        if horizon is None:
+            horizon = environment.trajectories.horizon
+        table = cls(environment.grid_h, environment.grid_w, horizon)
+        _, origins, velocities = environment.get_obstacle_trajectories()
+        moving = velocities.any(axis=1)
+        table.reserve_trajectories(origins[moving], velocities[moving])
+        return table
+
+    def reserve_trajectories(self, origins, velocities):
+        """
+        Reserves origin + t * velocity for every timestep of the horizon.
+
+        Args:
+            origins (np.ndarray): (n, 2) array of [x, y] at timestep 0.
+            velocities (np.ndarray): (n, 2) array of [dx, dy] per timestep.
+        """
+        steps = np.arange(self.horizon)[:, None, None]
+        positions = np.asarray(origins)[None] + steps * np.asarray(velocities)[None]
+        x, y = positions[..., 0], positions[..., 1]
+        inside = (x >= 0) & (x < self.grid_w) & (y >= 0) & (y < self.grid_h)
+        t = np.broadcast_to(steps[..., 0], x.shape)
+        keys = t[inside] * (self.grid_h * self.grid_w) + y[inside] * self.grid_w + x[inside]
+        self.reserved.update(keys.tolist())
+
+    def is_reserved(self, index, t):
+        """
+        Whether flat cell index is occupied at timestep t.
+        """
+        return t < self.horizon and t * self.grid_h * self.grid_w + index in self.reserved
+
+    def is_conflict(self, index, next_index, t):
+        """
+        Whether moving from index at timestep t to next_index at t + 1 runs into an
+        obstacle or swaps cells with one.
+        """
+        if self.is_reserved(next_index, t + 1):
+            return True
+        return index != next_index and self.is_reserved(next_index, t) and self.is_reserved(index, t + 1)
+
+    def __len__(self):
+        return len(self.reserved)
+
+
+class SpaceTimePlanner(PathPlanner):
+    """
+    A* over (cell, timestep) from the robot to the end. Moving obstacles block a
+    cell only at the timesteps the reservation table gives them. Static obstacles and
+    repulsion block it at every timestep, as in is_free_to_move.
+
+    The robot moves one cell or waits in place per timestep. Moves cost their Euclidean
+    length, waits cost wait_cost. Past the horizon the table is empty, so every
+    timestep from there on is searched as one.
+    """
+
+    def __init__(self, environment, obstacle_penalty, repulsion_penalty):
+        super().__init__(environment, obstacle_penalty, repulsion_penalty)
+        self.reservation_table = None
+        self.path = np.empty((0, 2), dtype=np.int64)
+        self.expanded = 0
+
+    def get_static_free(self, static_map):
+        # Cells of moving obstacles are reserved per timestep instead of blocked
+        free = list(static_map.free)
+        grid_w = self.environment.grid_w
+        static_cells = {(x, y) for x, y, dx, dy in self.environment.current_obstacles_position.values() if not dx and not dy}
+        static_mask = self.environment.static_obstacle_mask
+        for x, y, dx, dy in self.environment.current_obstacles_position.values():
+            if (dx or dy) and self.is_inside_grid(x, y) and (x, y) not in static_cells and not static_mask[y, x] and not self.environment.grid[y][x].repulsion_factor:
+                free[y * grid_w + x] = True
+        return free
+
+    def calculate_space_time_cost_from_robot_to_end(self, movement='queen', wait_cost=1.0, reservation_table=None):
+        """
+        Plans from the robot at timestep 0 to the end around the predicted obstacles.
+
+        Args:
+            movement (str, optional): Movement type. Defaults to 'queen'.
+            wait_cost (float, optional): Cost of staying in place for one timestep. Defaults to 1.0.
+            reservation_table (ReservationTable, optional): Defaults to one built from the environment.
+
+        Returns:
+            float: Cost of the path, nan if the end is unreachable.
+        """
+        env = self.environment
+        grid_w = env.grid_w
+        size = env.grid_h * grid_w
+        self.reservation_table = table = reservation_table or ReservationTable.from_environment(env)
+        horizon = table.horizon
+        free = self.get_static_free(self.get_static_map())
+        interior = self.get_interior_mask(1)
+        moves = self.get_neighbour_table(movement, 1) + ((0, 0, wait_cost, 0),)
+        start, goal = env.robot_y * grid_w + env.robot_x, env.end_y * grid_w + env.end_x
+        end_x, end_y = env.end_x, env.end_y
+
+        # States are t * size + index, with t capped at the horizon
+        costs, parents, closed = {start: 0.0}, {start: -1}, set()
+        open_list = PriorityQueue()
+        open_list.push(start, math.hypot(env.robot_x - end_x, env.robot_y - end_y))
+        self.expanded = 0
+        final = -1
+        while open_list:
+            _, state = open_list.pop()
+            closed.add(state)
+            self.expanded += 1
+            t, current = divmod(state, size)
+            if current == goal:
+                final = state
+                break
+            x, y = current % grid_w, current // grid_w
+            next_t = min(t + 1, horizon)
+            for dx, dy, step_cost, delta in moves:
+                if not interior[current] and not self.is_inside_grid(x + dx, y + dy):
+                    continue
+                index = current + delta
+                if not free[index] and index != goal:
+                    continue
+                if table.is_conflict(current, index, t):
+                    continue
+                next_state = next_t * size + index
+                cost = costs[state] + step_cost
+                if next_state not in closed and cost < costs.get(next_state, math.inf):
+                    costs[next_state] = cost
+                    parents[next_state] = state
+                    open_list.push(next_state, cost + math.hypot(x + dx - end_x, y + dy - end_y))
+
+        if final < 0:
+            self.path = np.empty((0, 2), dtype=np.int64)
+            return math.nan
+        states = [final]
+        while parents[states[-1]] >= 0:
+            states.append(parents[states[-1]])
+        indices = np.array(states[::-1], dtype=np.int64) % size
+        self.path = np.stack((indices % grid_w, indices // grid_w), axis=1)
+        return costs[final]
+
+    def raw_path_finder_from_robot_to_end(self, movement='queen', vectorized=False, context=None):
+        """
+        Returns the last space-time path, one row per timestep (waits repeat a cell
+        and have a [0, 0] orientation).
+        """
+        if context is not None:
+            return super().raw_path_finder_from_robot_to_end(movement, vectorized, context)
+        return self.path, np.diff(self.path, axis=0)
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from singaboat_vrx.custom_plan1.path_planning_utils import environment
+from singaboat_vrx.custom_plan1.path_planning_utils.search_context import StaticMap
+
+
+@dataclass
+class CandidatePath:
+    """
+    One distinct route found by a heuristic-weight sweep.
+
+    Attributes:
+        path (np.ndarray): (n, 2) array of [x, y] from the robot to the end.
+        orientation (np.ndarray): (n - 1, 2) array of steps along the path.
+        cost (float): Cost of the robot cell in the search that found the route.
+        expanded (int): Nodes expanded by that search.
+        k_factors (list): Every k_factor of the sweep that produced this route.
+    """
+    path: np.ndarray
+    orientation: np.ndarray
+    cost: float
+    expanded: int
+    k_factors: list = field(default_factory=list)
+
+
+# Planner of a pool worker, built once by init_sweep_worker and reused for every task
+worker_planner = None
+
+# Grid cells times k_factors below which a sweep runs in process by default: starting
+# the pool and sharing the map costs more than the searches themselves
+MIN_POOL_WORK = 200_000
+
+
+def init_sweep_worker(planner_class, shared_memory_name, grid_h, grid_w, robot, end, obstacle_penalty, repulsion_penalty):
+    """
+    Pool initializer: attaches the shared static map and builds the worker's planner.
+
+    Args:
+        planner_class (type): PathPlanner class to instantiate.
+        shared_memory_name (str): Name of the shared memory block holding StaticMap.layers().
+        grid_h (int): Height of the grid.
+        grid_w (int): Width of the grid.
+        robot (tuple): (x, y) of the robot.
+        end (tuple): (x, y) of the end point.
+        obstacle_penalty (float): Penalty for obstacles.
+        repulsion_penalty (float): Penalty for repulsion.
+    """
+    global worker_planner
+    block = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        layers = np.ndarray((StaticMap.LAYER_COUNT, grid_h * grid_w), dtype=np.float64, buffer=block.buf)
+        static_map = StaticMap.from_layers(grid_h, grid_w, layers)
+        del layers
+    finally:
+        block.close()
+    env = environment.Environment(grid_h, grid_w, grid_backend='array')
+    env.put_robot_and_end_in_memory(robot[0], robot[1], 0, 0, end[0], end[1])
+    worker_planner = planner_class(env, obstacle_penalty, repulsion_penalty)
+    worker_planner.load_static_map(static_map)
+
+
+def search_with_k_factor(planner, k_factor, movement, terminate_on):
+    """
+    Runs the reverse search from the end to the robot for one k_factor and extracts its path.
+
+    Returns:
+        tuple: (k_factor, path, orientation, cost, expanded)
+    """
+    env = planner.environment
+    context = planner.plan(env.end_x, env.end_y, env.robot_x, env.robot_y, movement, k_factor, terminate_on=terminate_on)
+    path, orientation = planner.extract_path(env.robot_x, env.robot_y, env.end_x, env.end_y, movement, context=context)
+    return k_factor, path, orientation, context.costs[env.robot_y * env.grid_w + env.robot_x], context.expanded
+
+
+def run_sweep_task(k_factor, movement, terminate_on):
+    return search_with_k_factor(worker_planner, k_factor, movement, terminate_on)
+
+
+def sweep_k_factors(planner, k_factors, movement='queen', terminate_on='push', max_workers=None):
+    """
+    Runs one search per k_factor and returns the distinct routes found.
+
+    Large sweeps run in a process pool whose workers attach a shared-memory copy
+    of the planner's static map once, instead of receiving the map with every
+    task. With max_workers=1 they run in this process instead.
+
+    Args:
+        planner (PathPlanner): Planner whose environment is searched.
+        k_factors (iterable): Heuristic weights to try.
+        movement (str, optional): Movement type. Defaults to 'queen'.
+        terminate_on (str, optional): 'push' or 'pop' goal detection. Defaults to 'push'.
+        max_workers (int, optional): Size of the process pool. Defaults to the CPU count,
+            or to 1 (in process) on one CPU, for a single k_factor or while grid cells
+            times k_factors stay below MIN_POOL_WORK.
+
+    Returns:
+        list: CandidatePath per distinct route, cheapest first. Failed searches are left out.
+    """
+    k_factors = [float(k_factor) for k_factor in k_factors]
+    static_map = planner.get_static_map()
+    env = planner.environment
+    if max_workers is None:
+        cpu_count = os.cpu_count() or 1
+        small = env.grid_h * env.grid_w * len(k_factors) < MIN_POOL_WORK
+        max_workers = 1 if cpu_count == 1 or len(k_factors) < 2 or small else cpu_count
+
+    if max_workers == 1:
+        results = [search_with_k_factor(planner, k_factor, movement, terminate_on) for k_factor in k_factors]
+    else:
+        layers = static_map.layers()
+        block = shared_memory.SharedMemory(create=True, size=layers.nbytes)
+        try:
+            static_map.layers(np.ndarray(layers.shape, dtype=layers.dtype, buffer=block.buf))
+            initargs = (type(planner), block.name, env.grid_h, env.grid_w, (env.robot_x, env.robot_y), (env.end_x, env.end_y), planner.obstacle_penalty, planner.repulsion_penalty)
+            with ProcessPoolExecutor(max_workers, initializer=init_sweep_worker, initargs=initargs) as executor:
+                results = list(executor.map(run_sweep_task, k_factors, [movement] * len(k_factors), [terminate_on] * len(k_factors)))
+        finally:
+            block.close()
+            block.unlink()
+
+    candidates = {}
+    for k_factor, path, orientation, cost, expanded in results:
+        if len(path) == 0:
+            continue
+        key = path.tobytes()
+        if key not in candidates:
+            candidates[key] = CandidatePath(path, orientation, cost, expanded)
+        candidates[key].k_factors.append(k_factor)
+    return sorted(candidates.values(), key=lambda candidate: candidate.cost)
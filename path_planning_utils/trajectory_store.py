@@ -0,0 +1,179 @@
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+
+class TrajectoryStore:
+    """
+    Constant-velocity obstacle trajectories kept as one origin and one velocity per
+    obstacle. Positions are computed on demand for any timestep, so memory is
+    O(obstacles) however long the horizon is.
+
+    Obstacle ids are assigned in insertion order (0, 1, 2, ...) and are the row of the
+    obstacle in the arrays.
+    """
+    __slots__ = ['horizon', 'origins', 'velocities', 'size']
+
+    def __init__(self, horizon, capacity=16):
+        """
+        Initializes an empty store.
+
+        Args:
+            horizon (int): Number of predicted timesteps of every trajectory.
+            capacity (int, optional): Initial number of rows. Defaults to 16.
+        """
+        self.horizon = horizon
+        self.origins = np.empty((capacity, 2), dtype=np.int64)
+        self.velocities = np.empty((capacity, 2), dtype=np.int64)
+        self.size = 0
+
+    def reserve(self, count):
+        # Grows the arrays geometrically, so appending stays amortized O(1)
+        if self.size + count > len(self.origins):
+            capacity = max(2 * len(self.origins), self.size + count)
+            for name in ('origins', 'velocities'):
+                grown = np.empty((capacity, 2), dtype=np.int64)
+                grown[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, grown)
+
+    def add(self, x, y, dx, dy):
+        """
+        Stores one obstacle.
+
+        Returns:
+            int: Id of the obstacle.
+        """
+        self.reserve(1)
+        obstacle_id = self.size
+        self.origins[obstacle_id] = x, y
+        self.velocities[obstacle_id] = dx, dy
+        self.size += 1
+        return obstacle_id
+
+    def add_many(self, xs, ys, dxs, dys):
+        """
+        Stores several obstacles at once.
+
+        Returns:
+            np.ndarray: Ids of the obstacles.
+        """
+        count = len(xs)
+        self.reserve(count)
+        rows = slice(self.size, self.size + count)
+        self.origins[rows, 0], self.origins[rows, 1] = xs, ys
+        self.velocities[rows, 0], self.velocities[rows, 1] = dxs, dys
+        self.size += count
+        return np.arange(rows.start, rows.stop)
+
+    def get_arrays(self):
+        """
+        Returns:
+            tuple: (ids, origins, velocities) views over the stored obstacles.
+        """
+        return np.arange(self.size), self.origins[:self.size], self.velocities[:self.size]
+
+    def position(self, obstacle_id, timestep):
+        """
+        Returns:
+            list: [x, y] of one obstacle at a timestep.
+        """
+        return (self.origins[obstacle_id] + timestep * self.velocities[obstacle_id]).tolist()
+
+    def positions_at(self, timestep):
+        """
+        Returns:
+            np.ndarray: (n, 2) array of every obstacle's [x, y] at a timestep.
+        """
+        return self.origins[:self.size] + timestep * self.velocities[:self.size]
+
+    def positions(self, start=0, stop=None):
+        """
+        Returns:
+            np.ndarray: (stop - start, n, 2) array of every obstacle's [x, y] over a range of timesteps.
+        """
+        stop = self.horizon if stop is None else stop
+        steps = np.arange(start, stop)[:, None, None]
+        return self.origins[None, :self.size] + steps * self.velocities[None, :self.size]
+
+    def occupants(self, x, y, timestep):
+        """
+        Returns:
+            np.ndarray: Ids of the obstacles occupying cell (x, y) at a timestep.
+        """
+        return np.flatnonzero((self.positions_at(timestep) == (x, y)).all(axis=1))
+
+    @property
+    def nbytes(self):
+        return self.origins.nbytes + self.velocities.nbytes
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, obstacle_id):
+        return 0 <= obstacle_id < self.size
+
+
+class TrajectoryView(Sequence):
+    """
+    Lazy [x, y] per timestep of one obstacle, in place of the old list of the whole path.
+    """
+    __slots__ = ['store', 'obstacle_id']
+
+    def __init__(self, store, obstacle_id):
+        self.store = store
+        self.obstacle_id = obstacle_id
+
+    def __len__(self):
+        return self.store.horizon
+
+    def __getitem__(self, timestep):
+        if isinstance(timestep, slice):
+            return [self[t] for t in range(*timestep.indices(len(self)))]
+        if timestep < 0:
+            timestep += len(self)
+        if not 0 <= timestep < len(self):
+            raise IndexError('timestep out of range')
+        return self.store.position(self.obstacle_id, timestep)
+
+    def __iter__(self):
+        steps = np.arange(self.store.horizon)[:, None]
+        return iter((self.store.origins[self.obstacle_id] + steps * self.store.velocities[self.obstacle_id]).tolist())
+
+
+class OrientationView(TrajectoryView):
+    """
+    Lazy [dx, dy] per timestep of one obstacle, constant along the trajectory.
+    """
+    __slots__ = []
+
+    def __getitem__(self, timestep):
+        if isinstance(timestep, slice):
+            return [self[t] for t in range(*timestep.indices(len(self)))]
+        if not -len(self) <= timestep < len(self):
+            raise IndexError('timestep out of range')
+        return self.store.velocities[self.obstacle_id].tolist()
+
+    def __iter__(self):
+        velocity = self.store.velocities[self.obstacle_id].tolist()
+        return (list(velocity) for _ in range(self.store.horizon))
+
+
+class ObstaclePaths(Mapping):
+    """
+    Read-only id -> {'movement': ..., 'orientation': ...} mapping over a TrajectoryStore,
+    with the same layout as the dict Environment.obstacles_path used to hold.
+    """
+    __slots__ = ['store']
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, obstacle_id):
+        if obstacle_id not in self.store:
+            raise KeyError(obstacle_id)
+        return {'movement': TrajectoryView(self.store, obstacle_id), 'orientation': OrientationView(self.store, obstacle_id)}
+
+    def __iter__(self):
+        return iter(range(len(self.store)))
+
+    def __len__(self):
+        return len(self.store)
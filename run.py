@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 from dataclasses import dataclass
 from singaboat_vrx.custom_plan1.path_planning_utils import environment,bstar
 import math
@@ -25,17 +24,19 @@ class PathParameters:
         ROBOT_DY (float): Y-direction vector of the robot.
         END_X (int): X-coordinate of the end point.
         END_Y (int): Y-coordinate of the end point.
-        OBSTACLES_X (list): List of X-coordinates of obstacles.
-        OBSTACLES_Y (list): List of Y-coordinates of obstacles.
-        OBSTACLES_DX (list): List of X-direction vectors of obstacles.
-        OBSTACLES_DY (list): List of Y-direction vectors of obstacles.
-        MAJOR_RANGES (list): List of major ranges for obstacles.
-        MINOR_RANGES (list): List of minor ranges for obstacles.
+        OBSTACLES_X (np.ndarray): X-coordinates of obstacles.
+        OBSTACLES_Y (np.ndarray): Y-coordinates of obstacles.
+        OBSTACLES_DX (np.ndarray): X-direction vectors of obstacles.
+        OBSTACLES_DY (np.ndarray): Y-direction vectors of obstacles.
+        OBSTACLE_MASK (np.ndarray): Boolean mask of the static obstacle cells, indexed as [y, x].
+        MAJOR_RANGES (np.ndarray): Major ranges for obstacles.
+        MINOR_RANGES (np.ndarray): Minor ranges for obstacles.
         OBSTACLE_PENALTY (float): Penalty factor for obstacles.
         REPULSION_PENALTY (float): Penalty factor for repulsion.
-        REPULSION_X (list): List of X-coordinates of repulsion points.
-        REPULSION_Y (list): List of Y-coordinates of repulsion points.
-        REPULSION_VALUES (list): List of repulsion values.
+        REPULSION_X (np.ndarray): X-coordinates of repulsion points.
+        REPULSION_Y (np.ndarray): Y-coordinates of repulsion points.
+        REPULSION_VALUES (np.ndarray): Repulsion values.
+        REPULSION_MASK (np.ndarray): Boolean mask of the repulsion cells, indexed as [y, x].
         MOVEMENT (str): Movement type (default is "queen").
         K_FACTOR (float): K-factor for path planning (default is 0.5).
     """
@@ -47,17 +48,19 @@ class PathParameters:
     ROBOT_DY: float
     END_X: int
     END_Y: int
-    OBSTACLES_X: list
-    OBSTACLES_Y: list
-    OBSTACLES_DX: list
-    OBSTACLES_DY: list
-    MAJOR_RANGES: list
-    MINOR_RANGES: list
+    OBSTACLES_X: np.ndarray
+    OBSTACLES_Y: np.ndarray
+    OBSTACLES_DX: np.ndarray
+    OBSTACLES_DY: np.ndarray
+    OBSTACLE_MASK: np.ndarray
+    MAJOR_RANGES: np.ndarray
+    MINOR_RANGES: np.ndarray
     OBSTACLE_PENALTY: float
     REPULSION_PENALTY: float
-    REPULSION_X: list
-    REPULSION_Y: list
-    REPULSION_VALUES: list
+    REPULSION_X: np.ndarray
+    REPULSION_Y: np.ndarray
+    REPULSION_VALUES: np.ndarray
+    REPULSION_MASK: np.ndarray
     MOVEMENT: str = "queen"
     K_FACTOR: float = 0.5
 
@@ -68,7 +71,7 @@ class RobotPathPlanner:
         Initializes the RobotPathPlanner with the given array and values representing robot, end, obstacles, and repulsion.
 
         Args:
-            array (np.ndarray): The numpy array representing the environment.
+            array (np.ndarray): The numpy array representing the environment, possibly memory-mapped.
             robot_value (int): The value in the array representing the robot's position.
             end_value (int): The value in the array representing the end position.
             obstacle_value (int): The value in the array representing obstacles.
@@ -105,103 +108,153 @@ class RobotPathPlanner:
         
         return dx, dy
 
-    def remove_position_from_obstacles(self, position, OBSTACLES_X, OBSTACLES_Y, OBSTACLES_DX, OBSTACLES_DY):
+    def environment_setup(self):
+        """
+        Sets up the environment with the given parameters and plots the initial state.
+
+        Returns:
+            Environment: The initialized environment object.
+        """
+        env = environment.Environment(self.params.GRID_H, self.params.GRID_W, grid_backend='array')
+        env.put_robot_and_end_in_memory(self.params.ROBOT_X, self.params.ROBOT_Y, self.params.ROBOT_DX, self.params.ROBOT_DY, self.params.END_X, self.params.END_Y)
+        # Every obstacle of the occupancy grid is static, so they are ingested as one mask
+        env.put_static_obstacle_mask(self.params.OBSTACLE_MASK)
+        # The repulsion factors are read straight from the occupancy grid through the mask
+        env.put_repulsion_mask_in_memory(self.params.REPULSION_MASK, self.array)
+        return env
+
+    def find_cell(self, value):
         """
-        Removes a given position from the list of obstacles if it exists.
+        Finds the first cell, in row-major order, holding a value.
 
         Args:
-            position (list): The position [x, y] to remove.
-            OBSTACLES_X (list): List of x coordinates of obstacles.
-            OBSTACLES_Y (list): List of y coordinates of obstacles.
-            OBSTACLES_DX (list): List of x directions of obstacles.
-            OBSTACLES_DY (list): List of y directions of obstacles.
+            value (int): The value to look for.
 
         Returns:
-            tuple: Updated lists of obstacle coordinates and directions.
+            tuple: (x, y) of the cell.
         """
-        obstacles_positions = [[x, y] for x, y in zip(OBSTACLES_X, OBSTACLES_Y)]
-        if position in obstacles_positions:
-            index = obstacles_positions.index(position)
-            OBSTACLES_X.pop(index)
-            OBSTACLES_Y.pop(index)
-            OBSTACLES_DX.pop(index)
-            OBSTACLES_DY.pop(index)
-        return OBSTACLES_X, OBSTACLES_Y, OBSTACLES_DX, OBSTACLES_DY
+        y, x = np.unravel_index(np.flatnonzero(self.array == value)[0], self.array.shape)
+        return int(x), int(y)
 
-    def environment_setup(self):
+    def update_cells(self, cells_x, cells_y, values):
         """
-        Sets up the environment with the given parameters and plots the initial state.
+        Writes new values into cells of the occupancy grid and brings the planner up to date.
+
+        Obstacle changes and moves of the robot or the end are applied to the prepared
+        environment in place. Any change involving repulsion cells rebuilds it, since the
+        offset repulsion of every cell depends on all the repulsion cells around it.
+
+        Args:
+            cells_x (array-like): X coordinates of the changed cells.
+            cells_y (array-like): Y coordinates of the changed cells.
+            values (array-like): New values of the cells.
 
         Returns:
-            Environment: The initialized environment object.
+            bool: True if the environment was updated in place, False if it was rebuilt.
         """
-        env = environment.Environment(self.params.GRID_H, self.params.GRID_W)
-        env.put_robot_and_end_in_memory(self.params.ROBOT_X, self.params.ROBOT_Y, self.params.ROBOT_DX, self.params.ROBOT_DY, self.params.END_X, self.params.END_Y)
-        env.put_obstacles_in_memory(self.params.OBSTACLES_X, self.params.OBSTACLES_Y, self.params.OBSTACLES_DX, self.params.OBSTACLES_DY)
-        env.put_repulsion_in_memory(self.params.REPULSION_X, self.params.REPULSION_Y, self.params.REPULSION_VALUES)
-        return env
+        if not self.array.flags.writeable:
+            # A memory-mapped or read-only grid is copied once, before its first change
+            self.array = np.array(self.array)
+        cells_x, cells_y = np.asarray(cells_x, dtype=np.int64), np.asarray(cells_y, dtype=np.int64)
+        previous = self.array[cells_y, cells_x]
+        self.array[cells_y, cells_x] = values
+        rebuild = (previous == 5).any() or (self.array[cells_y, cells_x] == 5).any()
+        previous_params = self.params
+        self.params = params = self.get_path_parameters_from_numpy_array()
+        if rebuild:
+            self.env = self.environment_setup()
+            self.planner = bstar.PathPlanner(self.env, params.OBSTACLE_PENALTY, params.REPULSION_PENALTY)
+            return False
+        if (params.ROBOT_X, params.ROBOT_Y, params.END_X, params.END_Y) != (previous_params.ROBOT_X, previous_params.ROBOT_Y, previous_params.END_X, previous_params.END_Y):
+            self.env.move_robot_and_end(params.ROBOT_X, params.ROBOT_Y, params.ROBOT_DX, params.ROBOT_DY, params.END_X, params.END_Y)
+        self.env.put_static_obstacle_mask(params.OBSTACLE_MASK & ~previous_params.OBSTACLE_MASK)
+        self.env.remove_static_obstacle_mask(previous_params.OBSTACLE_MASK & ~params.OBSTACLE_MASK)
+        return True
+
+    def move_robot_and_end(self, robot=None, end=None):
+        """
+        Moves the robot and/or the end to other cells, as update_cells does for the cells
+        holding robot_value and end_value: the old cells become free (0) and the new cells
+        take robot_value and end_value.
+
+        Args:
+            robot (tuple, optional): New (x, y) of the robot. Defaults to None, not moved.
+            end (tuple, optional): New (x, y) of the end. Defaults to None, not moved.
+
+        Returns:
+            bool: True if the environment was updated in place, False if it was rebuilt.
+        """
+        height, width = self.array.shape
+        for name, position in (('robot', robot), ('end', end)):
+            if position is not None and not (0 <= position[0] < width and 0 <= position[1] < height):
+                raise ValueError(f"{name} position must lie within the {width}x{height} grid, got {tuple(position)}")
+        cleared, placed = [], []
+        if robot is not None and tuple(robot) != (self.params.ROBOT_X, self.params.ROBOT_Y):
+            cleared.append((self.params.ROBOT_X, self.params.ROBOT_Y, 0))
+            placed.append((robot[0], robot[1], self.robot_value))
+        if end is not None and tuple(end) != (self.params.END_X, self.params.END_Y):
+            cleared.append((self.params.END_X, self.params.END_Y, 0))
+            placed.append((end[0], end[1], self.end_value))
+        if not placed:
+            return True
+        # Old cells are cleared first, so a new position may take the other's old cell
+        cells_x, cells_y, values = zip(*cleared, *placed)
+        return self.update_cells(cells_x, cells_y, values)
 
     def get_path_parameters_from_numpy_array(self ):
         """
         Extracts the necessary path planning parameters from the numpy array.
 
+        Obstacles and repulsion are returned as masks and arrays, never as per-cell lists,
+        and the input is only read, so a memory-mapped array (np.load(..., mmap_mode='r'))
+        is never copied.
+
         Returns:
             PathParameters: A dataclass containing the extracted parameters.
         """
-       
-        try:
-            length=int(math.sqrt(len(self.array)))
-            self.array = np.array(self.array).reshape((length, length))
-        except :
-            print("!!!!!!! \t ERROR OCCURD WHILE READING OCCUPANCY GRID \t !!!!!!!")
-            print("Type is ",type(self.array), "\t shape : ",self.array.shape)
-            print("unique: \t",np.unique(self.array))
-            print("_"*50)
+        self.array = np.asarray(self.array)
+        if self.array.ndim == 1:
+            # A flat occupancy grid is reshaped to a square view
+            length = math.isqrt(len(self.array))
+            try:
+                self.array = self.array.reshape((length, length))
+            except ValueError:
+                print("!!!!!!! \t ERROR OCCURD WHILE READING OCCUPANCY GRID \t !!!!!!!")
+                print("Type is ",type(self.array), "\t shape : ",self.array.shape)
+                print("unique: \t",np.unique(self.array))
+                print("_"*50)
        
         GRID_H, GRID_W = self.array.shape
         
-        ROBOT_Y, ROBOT_X = np.where(self.array == self.robot_value)
-        ROBOT_Y, ROBOT_X = ROBOT_Y.tolist()[0], ROBOT_X.tolist()[0]
-        
-        # try:
-        END_X, END_Y = np.where(self.array == self.end_value)
-        END_Y, END_X = END_X.tolist()[0], END_Y.tolist()[0]
+        ROBOT_X, ROBOT_Y = self.find_cell(self.robot_value)
+        END_X, END_Y = self.find_cell(self.end_value)
 
-        OBSTACLES_Y, OBSTACLES_X = np.where(self.array == self.obstacle_value)
-        OBSTACLES_Y, OBSTACLES_X = OBSTACLES_Y.tolist(), OBSTACLES_X.tolist()
+        # The robot and end cells are never obstacles
+        OBSTACLE_MASK = self.array == self.obstacle_value
+        OBSTACLE_MASK[ROBOT_Y, ROBOT_X] = False
+        OBSTACLE_MASK[END_Y, END_X] = False
+        OBSTACLES_Y, OBSTACLES_X = np.nonzero(OBSTACLE_MASK)
         
-        OBSTACLES_DX, OBSTACLES_DY = [0] * len(OBSTACLES_X), [0] * len(OBSTACLES_Y)
+        OBSTACLES_DX, OBSTACLES_DY = np.zeros_like(OBSTACLES_X), np.zeros_like(OBSTACLES_Y)
         OBSTACLE_PENALTY = 500.0
         REPULSION_PENALTY = 100.0
         
-        MAJOR_RANGES, MINOR_RANGES = [0, 0] * len(OBSTACLES_X), [0, 0] * len(OBSTACLES_Y)  
-        
-        # Check if the robot's position is in the list of obstacles
-        robot_position = [ROBOT_X, ROBOT_Y]
-        
-        OBSTACLES_X, OBSTACLES_Y, OBSTACLES_DX, OBSTACLES_DY = self.remove_position_from_obstacles(robot_position, OBSTACLES_X, OBSTACLES_Y, OBSTACLES_DX, OBSTACLES_DY)
-
-        # Check if the end position is in the list of obstacles
-        end_position = [END_X, END_Y]
-        OBSTACLES_X, OBSTACLES_Y, OBSTACLES_DX, OBSTACLES_DY = self.remove_position_from_obstacles(end_position, OBSTACLES_X, OBSTACLES_Y, OBSTACLES_DX, OBSTACLES_DY)
+        MAJOR_RANGES, MINOR_RANGES = np.zeros(2 * len(OBSTACLES_X), dtype=int), np.zeros(2 * len(OBSTACLES_Y), dtype=int)
         
         ROBOT_DX, ROBOT_DY = self.get_dx_dy([ROBOT_X, ROBOT_Y], [END_X, END_Y])
         
-        REPULSION_X, REPULSION_Y, REPULSION_VALUES = [], [], []
-        for y in range(self.array.shape[0]):
-            for x in range(self.array.shape[1]):
-                if self.array[y, x] == 5:
-                    REPULSION_X.append(x)
-                    REPULSION_Y.append(y)
-                    REPULSION_VALUES.append(self.array[y, x])
+        REPULSION_MASK = self.array == 5
+        REPULSION_Y, REPULSION_X = np.nonzero(REPULSION_MASK)
+        REPULSION_VALUES = self.array[REPULSION_Y, REPULSION_X]
         
         return PathParameters(
             GRID_H=GRID_H, GRID_W=GRID_W, ROBOT_X=ROBOT_X, ROBOT_Y=ROBOT_Y, 
             ROBOT_DX=ROBOT_DX, ROBOT_DY=ROBOT_DY, END_X=END_X, END_Y=END_Y, 
             OBSTACLES_X=OBSTACLES_X, OBSTACLES_Y=OBSTACLES_Y, OBSTACLES_DX=OBSTACLES_DX, 
-            OBSTACLES_DY=OBSTACLES_DY, MAJOR_RANGES=MAJOR_RANGES, MINOR_RANGES=MINOR_RANGES, 
+            OBSTACLES_DY=OBSTACLES_DY, OBSTACLE_MASK=OBSTACLE_MASK, MAJOR_RANGES=MAJOR_RANGES, MINOR_RANGES=MINOR_RANGES, 
             OBSTACLE_PENALTY=OBSTACLE_PENALTY, REPULSION_PENALTY=REPULSION_PENALTY,
-            REPULSION_X=REPULSION_X, REPULSION_Y=REPULSION_Y, REPULSION_VALUES=REPULSION_VALUES
+            REPULSION_X=REPULSION_X, REPULSION_Y=REPULSION_Y, REPULSION_VALUES=REPULSION_VALUES,
+            REPULSION_MASK=REPULSION_MASK
         )
 
     def run(self):
@@ -243,6 +296,19 @@ class RobotPathPlanner:
         # return [[x_cords, y_cords] for x_cords, y_cords in zip(x_path, y_path)]
         return points_list_with_1
     
+def import_planning_dependencies():
+    """
+    Imports the SciPy and rdp modules the planner loads on first use.
+
+    The planning modules import them lazily, so a process that only plans once pays
+    for them inside its first run(). Long-running or forking callers call this
+    once at start-up instead, so no request or worker pays for the import.
+    """
+    import rdp
+    import scipy.interpolate
+    import scipy.ndimage
+    import scipy.spatial.transform
+
 def main(file_path=None):
     """
     Main function to load a specific .npy file, initialize the planner, run the planning algorithm,
@@ -253,12 +319,10 @@ def main(file_path=None):
     """
 
     def process_npy_file(file_path):
-        # Load the .npy file
-        data = np.load(file_path)
-
-        print(f"Processing {file_path}: shape = {data.shape}")
+        # Map the .npy file instead of reading it, the planner never copies or writes it
+        array = np.load(file_path, mmap_mode='r')
 
-        array = np.load(file_path)
+        print(f"Processing {file_path}: shape = {array.shape}")
        
         planner = RobotPathPlanner(array)
         path = planner.run()
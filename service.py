@@ -0,0 +1,242 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# The service never plots, so matplotlib is kept off any GUI backend
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import numpy as np
+from run import RobotPathPlanner, import_planning_dependencies
+
+
+class StageTimer:
+    """
+    Count, total and worst time of every stage of the requests served so far.
+    """
+    __slots__ = ['stages']
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, stage, seconds):
+        count, total, worst = self.stages.get(stage, (0, 0.0, 0.0))
+        self.stages[stage] = (count + 1, total + seconds, max(worst, seconds))
+
+    def report(self):
+        """
+        Returns:
+            dict: stage -> {'count', 'mean', 'max'}, times in seconds.
+        """
+        return {stage: {'count': count, 'mean': total / count, 'max': worst} for stage, (count, total, worst) in self.stages.items()}
+
+
+class PlanningService:
+    """
+    Long-running planner that keeps one prepared RobotPathPlanner per map id.
+
+    Requests are JSON objects, one per line, and get one JSON line back with the same "id":
+
+        {"op": "load", "map": "a", "file": "grid.npy"}                 map from a .npy file
+        {"op": "load", "map": "a", "grid": [[0, 500, ...], ...]}       map from a nested list
+        {"op": "update", "map": "a", "cells": [[x, y, value], ...]}    changed cells of a map
+        {"op": "plan", "map": "a", "start": [x, y], "goal": [x, y]}     RobotPathPlanner.run() waypoints
+        {"op": "drop", "map": "a"}                                     forget a map
+        {"op": "stats"}                                                queue depth and stage timings
+
+    "plan" also accepts "file", "grid" and "cells", applied before planning. "start" and
+    "goal" are optional in "load", "update" and "plan". They move the robot and end cells
+    (values 1 and 2) of the map in place, keeping the prepared environment warm.
+    "map" defaults to "default".
+
+    Requests are queued and run one at a time on a worker thread, so the event loop keeps
+    reading requests and answers "stats" immediately. Every response carries the time spent
+    per stage: queue, load, update, move and plan.
+    """
+
+    def __init__(self):
+        self.planners = {}
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.timer = StageTimer()
+        self.served = 0
+
+    def get_stats(self):
+        return {'queue_depth': self.queue.qsize(), 'served': self.served, 'maps': sorted(self.planners), 'stages': self.timer.report()}
+
+    def load(self, request):
+        if 'file' in request:
+            array = np.load(request['file'], mmap_mode='r')
+        else:
+            array = np.asarray(request['grid'])
+        self.planners[request.get('map', 'default')] = RobotPathPlanner(array)
+
+    def update(self, request):
+        planner = self.get_planner(request)
+        cells = np.asarray(request['cells'], dtype=np.int64).reshape(-1, 3)
+        return planner.update_cells(cells[:, 0], cells[:, 1], cells[:, 2])
+
+    def move(self, request):
+        planner = self.get_planner(request)
+        return planner.move_robot_and_end(request.get('start'), request.get('goal'))
+
+    def plan(self, request):
+        planner = self.get_planner(request)
+        path = planner.run()
+        context = planner.planner.context
+        return {'status': 'ok' if len(path) else 'no_path', 'path': np.asarray(path).tolist(), 'expanded': context.expanded if context is not None else 0}
+
+    def get_planner(self, request):
+        map_id = request.get('map', 'default')
+        if map_id not in self.planners:
+            raise KeyError(f"unknown map {map_id!r}, load it first")
+        return self.planners[map_id]
+
+    def handle(self, request):
+        """
+        Serves one request on the worker thread.
+
+        Returns:
+            tuple: (response fields, {stage: seconds}).
+        """
+        op = request.get('op', 'plan')
+        response, timings = {}, {}
+
+        def timed(stage, function):
+            start = time.perf_counter()
+            result = function(request)
+            timings[stage] = time.perf_counter() - start
+            return result
+
+        if op == 'drop':
+            self.planners.pop(request.get('map', 'default'), None)
+        elif op not in ('load', 'update', 'plan'):
+            raise ValueError(f"unknown op {op!r}")
+        else:
+            if 'file' in request or 'grid' in request:
+                timed('load', self.load)
+            incremental = []
+            if 'cells' in request:
+                incremental.append(timed('update', self.update))
+            if 'start' in request or 'goal' in request:
+                incremental.append(timed('move', self.move))
+            if incremental:
+                response['incremental'] = all(incremental)
+            if op == 'plan':
+                response.update(timed('plan', self.plan))
+        return response, timings
+
+    async def serve_requests(self):
+        # Single consumer, the prepared planners are never used by two requests at once
+        loop = asyncio.get_running_loop()
+        while True:
+            request, queued, reply = await self.queue.get()
+            timings = {'queue': time.perf_counter() - queued}
+            try:
+                response, stage_timings = await loop.run_in_executor(self.executor, self.handle, request)
+                timings.update(stage_timings)
+                response = {'ok': True, **response}
+            except Exception as error:
+                response = {'ok': False, 'error': f'{type(error).__name__}: {error}'}
+            for stage, seconds in timings.items():
+                self.timer.add(stage, seconds)
+            self.served += 1
+            await reply({'id': request.get('id'), **response, 'timings': timings})
+            self.queue.task_done()
+
+    async def submit(self, line, reply):
+        """
+        Parses one request line and queues it, or answers it at once for "stats" and malformed lines.
+        """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('a request must be a JSON object')
+        except ValueError as error:
+            await reply({'id': None, 'ok': False, 'error': f'invalid request: {error}'})
+            return
+        if request.get('op') == 'stats':
+            await reply({'id': request.get('id'), 'ok': True, **self.get_stats()})
+            return
+        await self.queue.put((request, time.perf_counter(), reply))
+
+    async def read_requests(self, reader, reply):
+        while line := await reader.readline():
+            if line.strip():
+                await self.submit(line, reply)
+
+    async def serve_stdio(self):
+        """
+        Serves JSON lines from stdin until it closes. Stray prints of the planner go to
+        stderr, so stdout only carries responses.
+        """
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader(limit=2 ** 26)
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        output = os.fdopen(os.dup(sys.stdout.fileno()), 'w')
+        sys.stdout = sys.stderr
+
+        async def reply(response):
+            output.write(json.dumps(response) + '\n')
+            output.flush()
+
+        consumer = asyncio.create_task(self.serve_requests())
+        await self.read_requests(reader, reply)
+        await self.queue.join()
+        consumer.cancel()
+
+    async def serve_socket(self, path=None, port=None):
+        """
+        Serves JSON lines to every client of a Unix socket, or of a TCP port on 127.0.0.1.
+        """
+        async def client(reader, writer):
+            async def reply(response):
+                writer.write((json.dumps(response) + '\n').encode())
+                with contextlib.suppress(ConnectionError):
+                    await writer.drain()
+
+            try:
+                await self.read_requests(reader, reply)
+            finally:
+                writer.close()
+
+        sys.stdout = sys.stderr
+        consumer = asyncio.create_task(self.serve_requests())
+        if path is not None:
+            server = await asyncio.start_unix_server(client, path, limit=2 ** 26)
+        else:
+            server = await asyncio.start_server(client, '127.0.0.1', port, limit=2 ** 26)
+        print(f"planning service listening on {path or f'127.0.0.1:{port}'}", file=sys.stderr)
+        async with server:
+            try:
+                await server.serve_forever()
+            finally:
+                consumer.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Long-running planning service speaking JSON lines over stdio or a local socket.')
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument('--socket', help='Unix socket path to listen on')
+    transport.add_argument('--port', type=int, help='TCP port to listen on, on 127.0.0.1 only')
+    args = parser.parse_args()
+
+    async def serve():
+        # Paid once here, so the first plan's latency is planning work only
+        import_planning_dependencies()
+        service = PlanningService()
+        if args.socket or args.port:
+            await service.serve_socket(args.socket, args.port)
+        else:
+            await service.serve_stdio()
+
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(serve())
+
+
+if __name__ == '__main__':
+    main()